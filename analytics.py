@@ -0,0 +1,316 @@
+"""
+Flow analytics over action_events: cumulative flow, throughput, lead / cycle times, blocked time.
+
+Everything works on whole arrays (one row per event or per status interval), never action by
+action. Per-day aggregates are materialized in daily_flow, one pass over the new days only,
+so a two-year view reads a small table.
+"""
+from __future__ import annotations
+
+import time
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, func, insert, or_
+
+import db
+from db import ActionEvent, DailyFlow, np, pd
+
+DAY = 86400
+EPOCH = date(1970, 1, 1)
+DONE_STATUS = "Fait"
+IN_PROGRESS_STATUS = "En cours"
+BLOCKED_STATUS = "Bloqué"
+
+EVENT_FRAME_COLUMNS = ["id", "action_pk", "ts", "kind", "status", "dept_owner", "blockage"]
+DAILY_COLUMNS = ["day", "status", "dept_owner", "wip", "entered"]
+
+
+def _day_ts(d: date) -> int:
+    return (d - EPOCH).days * DAY
+
+
+def _today() -> date:
+    # Events are stamped in UTC seconds: days are UTC days
+    return datetime.utcnow().date()
+
+
+# -------------------- EVENTS --------------------
+def _events(s, since: Optional[int] = None, moved_only: bool = False, ever: Optional[str] = None) -> pd.DataFrame:
+    e = ActionEvent
+    stmt = select(e.id, e.action_pk, e.ts, e.kind, e.status, e.dept_owner, e.blockage)
+    if ever is not None:
+        stmt = stmt.where(e.action_pk.in_(select(e.action_pk).where(e.status == ever)))
+    if since is not None:
+        # State at `since`: each action's last event before it (ids grow with time per action)
+        last_before = select(func.max(e.id)).where(e.ts < since)
+        if moved_only:
+            last_before = last_before.where(e.action_pk.in_(select(e.action_pk).where(e.ts >= since)))
+        stmt = stmt.where(or_(e.ts >= since, e.id.in_(last_before.group_by(e.action_pk))))
+    df = pd.DataFrame.from_records(s.execute(stmt).all(), columns=EVENT_FRAME_COLUMNS)
+    return df.sort_values(["action_pk", "ts", "id"], kind="stable").reset_index(drop=True)
+
+
+@db._timed
+def load_events(since: Optional[int] = None, ever: Optional[str] = None) -> pd.DataFrame:
+    """
+    Events ordered by action then time. With `since` (Unix seconds): the events from then on,
+    plus the last earlier event of each action (its state at `since`). With `ever`: only the
+    actions that have been in that status.
+    """
+    with db.SessionLocal() as s:
+        return _events(s, since, ever=ever)
+
+
+def status_intervals(events: pd.DataFrame, now: Optional[int] = None) -> pd.DataFrame:
+    """
+    One interval per event: the action stays in the event's status (and department, blockage)
+    from its ts until the next event of the same action, or `now` for the last one.
+    """
+    now = int(time.time()) if now is None else now
+    pk = events["action_pk"].to_numpy()
+    ts = events["ts"].to_numpy()
+    same = np.append(pk[1:] == pk[:-1], False)
+    end = np.where(same, np.append(ts[1:], now), now)
+    return events.assign(start=ts, end=np.maximum(end, ts))
+
+
+def _transitions(events: pd.DataFrame) -> np.ndarray:
+    # Events that put the action in a new status (creation included)
+    pk = events["action_pk"].to_numpy()
+    status = events["status"].to_numpy()
+    first = np.insert(pk[1:] != pk[:-1], 0, True)
+    changed = np.insert(status[1:] != status[:-1], 0, True)
+    return first | changed
+
+
+# -------------------- DAILY AGGREGATES --------------------
+def _daily(events: pd.DataFrame, first_day: date, n_days: int, now: int) -> pd.DataFrame:
+    """
+    Per day of [first_day, first_day + n_days), status and department: actions in the status
+    at the end of the day (wip) and transitions into it during the day (entered).
+    """
+    if events.empty or n_days <= 0:
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+
+    t0 = _day_ts(first_day)
+    iv = status_intervals(events, now)
+    group, keys = pd.factorize(iv["status"].fillna("") + "\x1f" + iv["dept_owner"].fillna(""))
+    n_groups = len(keys)
+
+    # In the status at the end of day k  <=>  start < end of day k <= end
+    k_start = np.clip((iv["start"].to_numpy() - t0) // DAY, 0, n_days)
+    k_end = np.clip((iv["end"].to_numpy() - t0) // DAY, 0, n_days)
+    steps = np.zeros((n_groups, n_days + 1), dtype=np.int64)
+    np.add.at(steps, (group, k_start), 1)
+    np.add.at(steps, (group, k_end), -1)
+    wip = np.cumsum(steps, axis=1)[:, :n_days]
+
+    entered = np.zeros((n_groups, n_days), dtype=np.int64)
+    k_event = (iv["ts"].to_numpy() - t0) // DAY
+    hit = _transitions(iv) & (k_event >= 0) & (k_event < n_days)
+    np.add.at(entered, (group[hit], k_event[hit]), 1)
+
+    g, k = np.nonzero((wip > 0) | (entered > 0))
+    status_dept = pd.Series(np.asarray(keys, dtype=object)[g]).str.split("\x1f", n=1, expand=True)
+    return pd.DataFrame({
+        "day": [first_day + timedelta(days=int(d)) for d in k],
+        "status": status_dept[0].to_numpy(),
+        "dept_owner": status_dept[1].to_numpy(),
+        "wip": wip[g, k],
+        "entered": entered[g, k],
+    })
+
+
+def _extend(s, last_day: date, n_days: int, now: int) -> pd.DataFrame:
+    """
+    Daily rows for the `n_days` days after `last_day`, from the rows stored for `last_day`:
+    only the actions with events since then are replayed, the others keep their status.
+    """
+    key = ["status", "dept_owner"]
+    moved = _daily(_events(s, _day_ts(last_day + timedelta(days=1)), moved_only=True), last_day, n_days + 1, now)
+    stored = select(DailyFlow.status, DailyFlow.dept_owner, DailyFlow.wip).where(DailyFlow.day == last_day)
+    base = pd.DataFrame.from_records(s.execute(stored).all(), columns=key + ["wip"])
+
+    # Contribution of the actions that did not move, constant over the days
+    still = base.set_index(key)["wip"].sub(moved[moved["day"] == last_day].set_index(key)["wip"], fill_value=0)
+    still = still[still != 0].reset_index()
+    days = pd.DataFrame({"day": [last_day + timedelta(days=k) for k in range(1, n_days + 1)]})
+    out = pd.concat([days.merge(still, how="cross").assign(entered=0), moved[moved["day"] > last_day]])
+    if out.empty:
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+    out = out.groupby(["day"] + key, as_index=False)[["wip", "entered"]].sum()
+    out = out[(out["wip"] > 0) | (out["entered"] > 0)].astype({"wip": "int64", "entered": "int64"})
+    return out[DAILY_COLUMNS].reset_index(drop=True)
+
+
+def _pending_days(s, today: date) -> Tuple[Optional[date], Optional[date], int]:
+    # (last materialized day, first day to materialize, number of complete days to add)
+    last = s.execute(select(func.max(DailyFlow.day))).scalar_one()
+    first_ts = s.execute(select(func.min(ActionEvent.ts))).scalar_one()
+    if first_ts is None:
+        return last, None, 0
+    start = last + timedelta(days=1) if last else EPOCH + timedelta(days=int(first_ts) // DAY)
+    return last, start, max(0, (today - start).days)
+
+
+@db._timed
+def refresh_daily_flow() -> int:
+    """
+    Materializes the complete days (up to yesterday) not yet in daily_flow; returns how many.
+    Back-dated events (imports) clear the days after them, which are then recomputed here.
+    """
+    today = _today()
+    # Plain read first: a page visit with nothing to materialize never takes the writer lock
+    with db.SessionLocal() as s:
+        if _pending_days(s, today)[2] == 0:
+            return 0
+    with db._write_session() as s:
+        # Re-read under the lock: another writer may have materialized the days meanwhile
+        last, start, n_days = _pending_days(s, today)
+        if n_days <= 0:
+            return 0
+
+        if last:
+            rows = _extend(s, last, n_days, now=_day_ts(today))
+        else:
+            rows = _daily(_events(s), start, n_days, now=_day_ts(today))
+        if not rows.empty:
+            s.execute(insert(DailyFlow), rows.astype(object).to_dict("records"))
+        s.commit()
+    db._data_changed()
+    return n_days
+
+
+def _today_flow(today: date) -> pd.DataFrame:
+    # The current day is never materialized: extended live from yesterday, open intervals
+    # counted as reaching the end of the day
+    with db.SessionLocal() as s:
+        return _extend(s, today - timedelta(days=1), 1, now=_day_ts(today) + DAY)
+
+
+def _statuses(columns: Sequence[str]) -> List[str]:
+    domain = db.list_domain("statuses")
+    return [c for c in domain if c in columns] + sorted(c for c in columns if c not in domain)
+
+
+def daily_flow(days: int = 730, dept_owner: Optional[str] = None) -> pd.DataFrame:
+    """
+    daily_flow rows of the last `days` days, today included (live). Read-only: the complete
+    days come from refresh_daily_flow(), which the caller runs first.
+    """
+    # The UTC day is part of the cache key (the cache itself rolls over on the local date)
+    return _daily_flow(days, dept_owner, _today())
+
+
+@db._timed
+@db._cached
+def _daily_flow(days: int, dept_owner: Optional[str], today: date) -> pd.DataFrame:
+    start = today - timedelta(days=days)
+    stmt = select(*[getattr(DailyFlow, c) for c in DAILY_COLUMNS]).where(DailyFlow.day >= start)
+    if dept_owner and dept_owner != "Tous":
+        stmt = stmt.where(DailyFlow.dept_owner == dept_owner)
+    with db.SessionLocal() as s:
+        stored = pd.DataFrame.from_records(s.execute(stmt).all(), columns=DAILY_COLUMNS)
+
+    live = _today_flow(today)
+    if dept_owner and dept_owner != "Tous":
+        live = live[live["dept_owner"] == dept_owner]
+    return pd.concat([df for df in (stored, live) if not df.empty] or [stored], ignore_index=True)
+
+
+def cumulative_flow(days: int = 730, dept_owner: Optional[str] = None) -> pd.DataFrame:
+    """
+    Cumulative flow diagram: one row per day, one column per status (workflow order),
+    actions in that status at the end of the day.
+    """
+    flow = daily_flow(days, dept_owner)
+    if flow.empty:
+        return pd.DataFrame()
+    cfd = flow.pivot_table(index="day", columns="status", values="wip", aggfunc="sum", fill_value=0)
+    full = pd.Index([d.date() for d in pd.date_range(cfd.index.min(), cfd.index.max())], name="day")
+    return cfd.reindex(full, fill_value=0)[_statuses(cfd.columns)]
+
+
+def weekly_throughput(days: int = 730, dept_owner: Optional[str] = None) -> pd.DataFrame:
+    """
+    Actions closed ("Fait") per week (weeks starting on Monday): columns week, closed.
+    """
+    flow = daily_flow(days, dept_owner)
+    done = flow[flow["status"] == DONE_STATUS]
+    if done.empty:
+        return pd.DataFrame(columns=["week", "closed"])
+    day = pd.to_datetime(done["day"])
+    week = (day - pd.to_timedelta(day.dt.weekday, unit="D")).dt.date
+    out = done.groupby(week)["entered"].sum()
+    return pd.DataFrame({"week": out.index, "closed": out.to_numpy()})
+
+
+# -------------------- LEAD / CYCLE TIME --------------------
+@db._timed
+@db._cached
+def lead_cycle_times(percentiles: Sequence[int] = (50, 85, 95)) -> pd.DataFrame:
+    """
+    Per department (of the last event), percentiles in days of:
+    lead time = creation -> last entry into "Fait", cycle time = first "En cours" -> that entry.
+    Only actions currently "Fait" count; `count` is their number.
+    """
+    events = load_events(ever=DONE_STATUS)
+    if events.empty:
+        return pd.DataFrame()
+
+    pk = events["action_pk"].to_numpy()
+    ts = events["ts"].to_numpy()
+    status = events["status"].to_numpy()
+    entry = _transitions(events)
+    last = np.append(pk[1:] != pk[:-1], True)
+
+    per_action = pd.DataFrame({"action_pk": pk, "ts": ts})
+    created = per_action.groupby("action_pk")["ts"].min()
+    started = per_action[entry & (status == IN_PROGRESS_STATUS)].groupby("action_pk")["ts"].min()
+    done_at = per_action[entry & (status == DONE_STATUS)].groupby("action_pk")["ts"].max()
+
+    final = events.loc[last & (status == DONE_STATUS), ["action_pk", "dept_owner"]].set_index("action_pk")
+    final["lead"] = (done_at.reindex(final.index) - created.reindex(final.index)) / DAY
+    cycle = (done_at.reindex(final.index) - started.reindex(final.index)) / DAY
+    final["cycle"] = cycle.where(cycle >= 0)
+
+    q = [p / 100 for p in percentiles]
+    grouped = final.groupby("dept_owner")
+    out = pd.concat({
+        "count": grouped.size(),
+        **{f"lead_p{p}": grouped["lead"].quantile(x) for p, x in zip(percentiles, q)},
+        **{f"cycle_p{p}": grouped["cycle"].quantile(x) for p, x in zip(percentiles, q)},
+    }, axis=1)
+    return out.round(1).reset_index()
+
+
+# -------------------- BLOCKED TIME --------------------
+@db._timed
+@db._cached
+def blocked_pareto(days: Optional[int] = None, dept_owner: Optional[str] = None) -> pd.DataFrame:
+    """
+    Time spent "Bloqué" per blockage reason (days), largest first, with the cumulative share.
+    `days` restricts to the blocked time within the last `days` days.
+    """
+    now = int(time.time())
+    since = None if days is None else now - days * DAY
+    iv = status_intervals(load_events(since, ever=BLOCKED_STATUS), now)
+    iv = iv[iv["status"] == BLOCKED_STATUS]
+    if dept_owner and dept_owner != "Tous":
+        iv = iv[iv["dept_owner"] == dept_owner]
+    if iv.empty:
+        return pd.DataFrame(columns=["blockage", "days", "share", "cumulative_share"])
+
+    start = iv["start"] if since is None else iv["start"].clip(lower=since)
+    blocked_days = (iv["end"] - start).clip(lower=0) / DAY
+    reason = iv["blockage"].fillna("").replace("", "Non renseigné")
+    out = blocked_days.groupby(reason).sum().sort_values(ascending=False)
+    out = out[out > 0]
+    share = out / out.sum() if out.sum() else out * 0
+    return pd.DataFrame({
+        "blockage": out.index,
+        "days": out.round(1).to_numpy(),
+        "share": share.round(3).to_numpy(),
+        "cumulative_share": share.cumsum().round(3).to_numpy(),
+    })
@@ -0,0 +1,199 @@
+"""
+Read-only JSON service for the shop-floor displays (TV dashboards).
+
+    python api.py --port 8502
+
+GET /api/kpis, /api/top, /api/blocked, /api/pareto, /api/closed, or /api/dashboard for the
+first four, with the dashboard filters as query parameters:
+/api/dashboard?dept_owner=ASSY&type=Flux&only_open=1
+
+Every response carries an ETag built from the data version: a poll sending it back in
+If-None-Match gets 304 while nothing changed, without any database work.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import db
+
+DEFAULT_PORT = 8502
+SECTIONS = ("kpis", "top", "blocked", "pareto", "closed")
+# What a display shows; the closures of the week can be long, they have their own endpoint
+DASHBOARD_SECTIONS = ("kpis", "top", "blocked", "pareto", "matching")
+# ETags of a previous run of the service never match (the data version restarts at 0)
+BOOT = format(time.time_ns(), "x")
+BODY_CACHE_SIZE = 64
+_FALSE_WORDS = ("0", "false", "non", "no", "n")
+
+
+def _records(df: db.pd.DataFrame) -> list:
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def dashboard_payload(dept_owner: str = "Tous", type: str = "Tous", only_open: bool = True) -> Dict[str, Any]:
+    """
+    dashboard_snapshot() as JSON-ready values.
+    """
+    snap = db.dashboard_snapshot(dept_owner=dept_owner, type=type, only_open=only_open)
+    return {
+        "kpis": snap.kpis,
+        "top": _records(snap.top),
+        "blocked": _records(snap.blocked),
+        "pareto": _records(snap.pareto),
+        "closed": _records(snap.closed),
+        "matching": snap.matching,
+    }
+
+
+def _filters(query: str) -> Tuple[str, str, bool]:
+    params = {k: v[-1] for k, v in parse_qs(query).items()}
+    only_open = params.get("only_open", "1").strip().lower() not in _FALSE_WORDS
+    return params.get("dept_owner", "Tous"), params.get("type", "Tous"), only_open
+
+
+def _etag() -> str:
+    # The day is part of it: late / closed_7d move at midnight without any write
+    return f'"{BOOT}-{db.sync_data_version()}-{date.today():%Y%m%d}"'
+
+
+class _BodyCache:
+    # Encoded responses of the current data version, shared by all the displays. One build
+    # per key: after a write, the displays polling it wait for it instead of all querying.
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._building: Dict[Tuple[str, ...], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: Tuple[str, ...], etag: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def get_or_build(self, key: Tuple[str, ...], etag: str, build: Callable[[], bytes]) -> bytes:
+        body = self._get(key, etag)
+        if body is not None:
+            return body
+        with self._lock:
+            building = self._building.setdefault(key, threading.Lock())
+        with building:
+            body = self._get(key, etag)
+            if body is None:
+                body = build()
+                with self._lock:
+                    self._entries[key] = (etag, body)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.maxsize:
+                        evicted, _ = self._entries.popitem(last=False)
+                        self._building.pop(evicted, None)
+        return body
+
+
+_bodies = _BodyCache(BODY_CACHE_SIZE)
+
+
+def _body(section: str, filters: Tuple[str, str, bool]) -> bytes:
+    with db.timed_section(f"API · {section}"):
+        if section == "kpis":
+            value: Any = db.kpis()
+        else:
+            payload = dashboard_payload(*filters)
+            if section == "dashboard":
+                value = {k: payload[k] for k in DASHBOARD_SECTIONS}
+            else:
+                value = payload[section]
+        return json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+
+
+class DashboardHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"      # keep-alive: a display reuses its connection
+    server_version = "QR1Api/1.0"
+    quiet = True
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            self._send(200, b'{"status": "ok"}')
+            return
+        section = url.path.removeprefix("/api/")
+        if not url.path.startswith("/api/") or section not in SECTIONS + ("dashboard",):
+            self._send(404, json.dumps({"error": f"inconnu : {url.path}"}).encode("utf-8"))
+            return
+
+        etag = _etag()
+        if etag in (self.headers.get("If-None-Match") or ""):
+            self._send(304, b"", etag)
+            return
+
+        filters = _filters(url.query)
+        key = (section,) + tuple(map(str, filters))
+        try:
+            body = _bodies.get_or_build(key, etag, lambda: _body(section, filters))
+        except Exception as exc:
+            self._send(500, json.dumps({"error": str(exc)}, ensure_ascii=False).encode("utf-8"))
+            return
+        self._send(200, body, etag)
+
+    def _send(self, status: int, body: bytes, etag: Optional[str] = None) -> None:
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        # Displays must revalidate each poll (cheap: 304)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+class DashboardServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256           # hundreds of displays connecting at once
+
+
+def make_server(host: str = "0.0.0.0", port: int = DEFAULT_PORT) -> DashboardServer:
+    db.init_db()
+    return DashboardServer((host, port), DashboardHandler)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", help="database URL (default: the app's)")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    if args.db:
+        db.use_database(args.db)
+    DashboardHandler.quiet = not args.verbose
+    server = make_server(args.host, args.port)
+    print(f"QR1 API on http://{args.host}:{server.server_address[1]}/api/dashboard")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
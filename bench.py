@@ -0,0 +1,542 @@
+"""
+Benchmarks of the db.py hot paths on synthetic plant-scale data.
+
+    python bench.py --rows 10000 --rows 100000 --out bench.json
+
+Each size gets its own scratch SQLite file in --workdir (reused when it already holds the right
+number of rows). Results: p50/p95 latency (ms) and peak Python memory (KiB) per case, plus cold-start
+timings (import, init_db, first Dashboard render), a load test of the JSON service (hundreds
+of displays polling api.py) and a shift-change write burst (per-call commits vs the write
+queue), as JSON.
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.request
+from datetime import datetime, date
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, insert, select, func
+
+import analytics
+import db
+
+
+# -------------------- SYNTHETIC DATA --------------------
+STATUS_WEIGHTS = {"À faire": 0.25, "En cours": 0.25, "Bloqué": 0.08, "Fait": 0.37, "Annulé": 0.05}
+PRIORITY_WEIGHTS = {"P1": 0.15, "P2": 0.35, "P3": 0.50}
+DEPT_WEIGHTS = {"ASSY": 0.35, "Lean": 0.15, "Maintenance": 0.25, "Engi": 0.10, "Qualité": 0.15}
+ZONES = ["Contrôle final", "Kitting", "Ligne 1", "Ligne 2", "Ligne 3", "Magasin", "Peinture", "Soudure"]
+WORDS = [
+    "rayure", "pièce", "montage", "vis", "couple", "serrage", "fuite", "huile", "capteur", "défaut",
+    "qualité", "retard", "flux", "outil", "usure", "opérateur", "standard", "protection", "mousse",
+    "étiquette", "carton", "convoyeur", "arrêt", "bourrage", "réglage", "gabarit", "contrôle",
+]
+
+
+def _choice(rng: np.random.Generator, weights: Dict[str, float], n: int) -> np.ndarray:
+    keys = list(weights)
+    p = np.array([weights[k] for k in keys])
+    return np.array(keys, dtype=object)[rng.choice(len(keys), size=n, p=p / p.sum())]
+
+
+def _sentences(rng: np.random.Generator, n: int, words: int) -> List[str]:
+    picks = rng.integers(0, len(WORDS), size=(n, words))
+    vocab = np.array(WORDS, dtype=object)
+    return [" ".join(row) for row in vocab[picks]]
+
+
+def synthetic_actions(n: int, seed: int = 42, start_id: int = 1) -> pd.DataFrame:
+    """
+    `n` realistic actions over the last two years (vectorized, ~1 s per 100k rows).
+    """
+    rng = np.random.default_rng(seed)
+    now = datetime.now().replace(microsecond=0)
+    today = date.today()
+
+    created = now - pd.to_timedelta(rng.integers(0, 730 * 24 * 3600, size=n), unit="s")
+    status = _choice(rng, STATUS_WEIGHTS, n)
+    due = (created.normalize() + pd.to_timedelta(rng.integers(3, 60, size=n), unit="D"))
+    due_dates = pd.Series(due.date, dtype=object).where(rng.random(n) > 0.05, None)
+    closed = created.normalize() + pd.to_timedelta(rng.integers(1, 90, size=n), unit="D")
+    closed = np.minimum(closed, pd.Timestamp(today))
+    closed_at = pd.Series(pd.DatetimeIndex(closed).date, dtype=object).where(status == "Fait", None)
+    blocked = status == "Bloqué"
+    blockages = np.array(db.DEFAULT_LISTS["blockages"], dtype=object)
+
+    return pd.DataFrame({
+        "action_id": [f"A-{i:04d}" for i in range(start_id, start_id + n)],
+        "created_at": created.to_pydatetime(),
+        "created_by": "bench",
+        "zone": np.array(ZONES, dtype=object)[rng.integers(0, len(ZONES), size=n)],
+        "line": "",
+        "machine": [f"M{m:02d}" for m in rng.integers(1, 40, size=n)],
+        "type": _choice(rng, {t: 1.0 for t in db.DEFAULT_LISTS["types"]}, n),
+        "m6": _choice(rng, {m: 1.0 for m in db.DEFAULT_LISTS["m6"]}, n),
+        "problem": _sentences(rng, n, 8),
+        "impact": "",
+        "containment": _sentences(rng, n, 4),
+        "root_cause": _sentences(rng, n, 5),
+        "countermeasure": _sentences(rng, n, 6),
+        "action_kind": _choice(rng, {k: 1.0 for k in db.DEFAULT_LISTS["action_kinds"]}, n),
+        "dept_owner": _choice(rng, DEPT_WEIGHTS, n),
+        "owner_name": [f"Resp {o}" for o in rng.integers(1, 60, size=n)],
+        "support_needed": "",
+        "priority": _choice(rng, PRIORITY_WEIGHTS, n),
+        "due_date": due_dates,
+        "status": status,
+        "blockage": np.where(blocked, blockages[rng.integers(0, len(blockages), size=n)], ""),
+        "next_step": _sentences(rng, n, 4),
+        "closed_at": closed_at,
+        "proof_link": "",
+        "standard_updated": rng.random(n) < 0.3,
+        "quality_validation_required": rng.random(n) < 0.2,
+    })
+
+
+def load_synthetic(n: int, batch: int = 20000) -> None:
+    with db.SessionLocal() as s:
+        for start in range(0, n, batch):
+            part = synthetic_actions(min(batch, n - start), seed=start, start_id=start + 1)
+            records = part.astype(object).where(part.notna(), None).to_dict("records")
+            s.execute(insert(db.Action), records)
+            # Their history: created, then closed for the "Fait" ones
+            ids = range(start + 1, start + 1 + len(part))
+            db._log_events(s, db._initial_events(part.assign(id=ids), int(time.time())))
+            db._index_signatures(s, list(ids), part["problem"].tolist(), replace=False)
+        s.commit()
+
+
+def prepare_database(path: str, n: int) -> None:
+    url = f"sqlite:///{path}"
+    if os.path.exists(path):
+        db.use_database(url)
+        db.init_db()
+        with db.SessionLocal() as s:
+            if s.execute(select(func.count(db.Action.id))).scalar_one() == n:
+                return
+        db.engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    db.use_database(url)
+    db.init_db()
+    load_synthetic(n)
+    db.clear_cache()
+
+
+# -------------------- MEASURES --------------------
+def measure(fn: Callable[[], Any], repeat: int, cold: bool = True) -> Dict[str, Any]:
+    """
+    Latency over `repeat` runs (query cache cleared before each run when `cold`),
+    then one extra run under tracemalloc for the peak memory.
+    """
+    samples: List[float] = []
+    for _ in range(repeat):
+        if cold:
+            db.clear_cache()
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+
+    if cold:
+        db.clear_cache()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "runs": repeat,
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        "min_ms": round(min(samples), 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+FILTER_CASES: Dict[str, Dict[str, Any]] = {
+    "all": {},
+    "only_open": {"only_open": True},
+    "dept": {"dept_owner": "Maintenance"},
+    "dept_type": {"dept_owner": "ASSY", "type": "Qualité"},
+    "status": {"status": "Bloqué"},
+    "priority_open": {"priority": "P1", "only_open": True},
+    "search": {"search": "fuite huile"},
+    "combined": {"dept_owner": "ASSY", "type": "Flux", "priority": "P2", "only_open": True, "search": "retard"},
+}
+
+
+def bench_reads(repeat: int) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for name, filters in FILTER_CASES.items():
+        out[f"list_actions[{name}]"] = measure(lambda f=filters: db.list_actions(f), repeat)
+    out["list_actions[editor columns]"] = measure(
+        lambda: db.list_actions({}, columns=["action_id"] + db.UPDATABLE_COLUMNS), repeat
+    )
+    out["list_actions_page[first]"] = measure(lambda: db.list_actions_page({}, page_size=200), repeat)
+    out["list_actions[warm cache]"] = measure(lambda: db.list_actions({}), repeat, cold=False)
+    out["list_actions[categorical]"] = measure(lambda: db.list_actions({}, categorical=True), repeat)
+    summary = db.SUMMARY_COLUMNS + ["problem_preview"]
+    out["list_actions[summary + preview]"] = measure(lambda: db.list_actions({}, columns=summary), repeat)
+    out["details[50 ids]"] = measure(
+        lambda: db.get_action_details(db.list_actions_page({}, ["action_id"], page_size=50).df["action_id"].tolist()),
+        repeat,
+    )
+    out["frame_kib[list_actions]"] = {
+        "strings": round(db.list_actions({}).memory_usage(deep=True).sum() / 1024, 1),
+        "categorical": round(db.list_actions({}, categorical=True).memory_usage(deep=True).sum() / 1024, 1),
+        "summary + preview": round(db.list_actions({}, columns=summary).memory_usage(deep=True).sum() / 1024, 1),
+    }
+    out["kpis"] = measure(db.kpis, repeat)
+    out["dashboard_snapshot"] = measure(db.dashboard_snapshot, repeat)
+    out["top_actions[dept]"] = measure(lambda: db.top_actions({"dept_owner": "Maintenance"}), repeat)
+    out["type_pareto"] = measure(db.type_pareto, repeat)
+    out["similar_actions"] = measure(lambda: db.similar_actions("fuite huile convoyeur, retard au montage"), repeat)
+    return out
+
+
+def bench_analytics(repeat: int) -> Dict[str, Any]:
+    def rebuild() -> None:
+        with db._write_session() as s:
+            s.execute(delete(db.DailyFlow))
+            s.commit()
+        analytics.refresh_daily_flow()
+
+    return {
+        "refresh_daily_flow[full rebuild]": measure(rebuild, max(1, repeat // 2)),
+        "cumulative_flow[2 years]": measure(lambda: analytics.cumulative_flow(730), repeat),
+        "lead_cycle_times": measure(analytics.lead_cycle_times, repeat),
+        "blocked_pareto[90 days]": measure(lambda: analytics.blocked_pareto(90), repeat),
+    }
+
+
+def bench_writes(repeat: int, batch_sizes: List[int]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    rng = random.Random(7)
+    base = db.list_actions({}, columns=["action_id"] + db.UPDATABLE_COLUMNS)
+    statuses = db.DEFAULT_LISTS["statuses"]
+
+    for size in batch_sizes:
+        size = min(size, len(base))
+
+        def run(size=size) -> None:
+            rows = base.sample(size, random_state=rng.randint(0, 10**6)).copy()
+            rows["status"] = [rng.choice(statuses) for _ in range(size)]
+            db.update_actions_from_df(rows)
+
+        out[f"update_actions_from_df[{size}]"] = measure(run, repeat)
+
+    out["next_action_id"] = measure(db.next_action_id, repeat)
+
+    creations = 200
+    t0 = time.perf_counter()
+    for i in range(creations):
+        db.create_action({"problem": f"bench {i}", "countermeasure": "bench", "owner_name": "bench", "dept_owner": "Lean"})
+    elapsed = time.perf_counter() - t0
+    out["create_action"] = {"runs": creations, "per_s": round(creations / elapsed, 1), "mean_ms": round(elapsed / creations * 1000, 3)}
+    return out
+
+
+def bench_group_commit(writers: int, per_writer: int = 50) -> Dict[str, Any]:
+    """
+    Shift-change burst: `writers` sessions at once, each creating `per_writer` actions and
+    saving an edit of its last five every five. One commit per call, then the write queue.
+    """
+    def burst() -> Dict[str, Any]:
+        latencies: List[float] = []
+        lock = threading.Lock()
+
+        def session(k: int) -> None:
+            mine: List[str] = []
+            times: List[float] = []
+            for i in range(per_writer):
+                t0 = time.perf_counter()
+                mine.append(db.create_action({
+                    "problem": f"burst {k}-{i}", "countermeasure": "burst", "owner_name": f"Resp {k}",
+                    "dept_owner": "ASSY", "due_date": date.today(),
+                }))
+                times.append(time.perf_counter() - t0)
+                if i % 5 == 4:
+                    t0 = time.perf_counter()
+                    db.update_actions_from_df(pd.DataFrame({"action_id": mine[-5:], "priority": "P1"}))
+                    times.append(time.perf_counter() - t0)
+            with lock:
+                latencies.extend(times)
+
+        threads = [threading.Thread(target=session, args=(k,)) for k in range(writers)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        ms = np.array(latencies) * 1000
+        return {
+            "requests": len(latencies),
+            "per_s": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(float(np.percentile(ms, 50)), 3),
+            "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        }
+
+    out: Dict[str, Any] = {"writers": writers, "per_call_commit": burst()}
+    writer = db.enable_write_queue()
+    try:
+        out["write_queue"] = burst()
+        out["write_queue"]["transactions"] = writer.batches
+    finally:
+        db.disable_write_queue()
+    return out
+
+
+def bench_refresh(repeat: int, changed: int = 2) -> Dict[str, Any]:
+    """
+    Board refresh after a write of `changed` rows: full reload vs changes_since + merge_changes.
+    """
+    filters = {"only_open": True}
+    loaded = db.changes_since(None, filters)
+    board, version = loaded.rows, loaded.version
+    rng = random.Random(11)
+
+    full: List[float] = []
+    delta: List[float] = []
+    for i in range(repeat):
+        rows = board[["action_id", "next_step"]].sample(changed, random_state=rng.randint(0, 10**6))
+        db.update_actions_from_df(rows.assign(next_step=f"bench refresh {i}"))
+
+        db.clear_cache()
+        t0 = time.perf_counter()
+        db.list_actions(filters)
+        full.append((time.perf_counter() - t0) * 1000)
+
+        db.clear_cache()
+        t0 = time.perf_counter()
+        changes = db.changes_since(version, filters)
+        board, version = db.merge_changes(board, changes), changes.version
+        delta.append((time.perf_counter() - t0) * 1000)
+
+    def summary(samples: List[float]) -> Dict[str, Any]:
+        return {
+            "runs": repeat,
+            "p50_ms": round(statistics.median(samples), 3),
+            "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        }
+
+    return {f"refresh[full, {changed} changed]": summary(full), f"refresh[delta, {changed} changed]": summary(delta)}
+
+
+def bench_export(repeat: int) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for fmt in ("csv", "xlsx"):
+        out[f"export_actions[{fmt}]"] = measure(lambda f=fmt: db.export_actions(f), repeat)
+    return out
+
+
+_STARTUP_SCRIPT = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import db
+t_import = time.perf_counter() - t0
+lazy = "pandas" not in sys.modules
+db.use_database(sys.argv[1])
+t0 = time.perf_counter(); db.init_db(); t_init = time.perf_counter() - t0
+t0 = time.perf_counter(); db.init_db(); t_init2 = time.perf_counter() - t0
+t_render = None
+try:
+    from streamlit.testing.v1 import AppTest
+    t0 = time.perf_counter()
+    AppTest.from_file(sys.argv[2], default_timeout=120).run()
+    t_render = time.perf_counter() - t0
+except ImportError:
+    pass
+print(json.dumps({"import_db_ms": t_import * 1000, "pandas_deferred": lazy, "init_db_first_ms": t_init * 1000,
+                  "init_db_again_ms": t_init2 * 1000, "first_render_dashboard_ms": t_render and t_render * 1000}))
+"""
+
+
+def bench_startup(path: str, repeat: int) -> Dict[str, Any]:
+    """
+    Cold process each run: `import db`, init_db() first/second call, first Dashboard render.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    page = os.path.join(here, "pages", "1_Dashboard_QR1.py")
+    runs: List[Dict[str, Any]] = []
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT, f"sqlite:///{path}", page],
+            cwd=here, capture_output=True, text=True, check=True,
+        )
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    out: Dict[str, Any] = {"pandas_deferred": all(r["pandas_deferred"] for r in runs)}
+    for key in ("import_db_ms", "init_db_first_ms", "init_db_again_ms", "first_render_dashboard_ms"):
+        samples = [r[key] for r in runs if r[key] is not None]
+        if samples:
+            out[key] = {"p50": round(statistics.median(samples), 3), "max": round(max(samples), 3)}
+    return out
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def bench_api(path: str, pollers: int, seconds: float = 10.0, interval: float = 0.5) -> Dict[str, Any]:
+    """
+    api.py in its own process, `pollers` displays polling /api/dashboard every `interval` s
+    with If-None-Match, while this process changes one action per second.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(here, "api.py"), "--host", "127.0.0.1", "--port", str(port),
+         "--db", f"sqlite:///{path}"],
+        cwd=here, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.perf_counter() + 60
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1).read()
+                break
+            except OSError:
+                if time.perf_counter() > deadline:
+                    raise
+                time.sleep(0.2)
+
+        samples: Dict[int, List[float]] = {}
+        errors: List[str] = []
+        lock = threading.Lock()
+        stop = time.perf_counter() + seconds
+
+        def poll(i: int) -> None:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            etag = None
+            time.sleep(interval * i / pollers)     # spread the displays over the interval
+            while time.perf_counter() < stop:
+                t0 = time.perf_counter()
+                try:
+                    conn.request("GET", "/api/dashboard", headers={"If-None-Match": etag} if etag else {})
+                    resp = conn.getresponse()
+                    resp.read()
+                except OSError as exc:
+                    with lock:
+                        errors.append(type(exc).__name__)
+                    conn.close()
+                    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                    continue
+                ms = (time.perf_counter() - t0) * 1000
+                etag = resp.getheader("ETag", etag)
+                with lock:
+                    samples.setdefault(resp.status, []).append(ms)
+                time.sleep(max(0.0, interval - ms / 1000))
+            conn.close()
+
+        threads = [threading.Thread(target=poll, args=(i,), daemon=True) for i in range(pollers)]
+        for t in threads:
+            t.start()
+        board = db.list_actions({"only_open": True}, columns=["action_id", "next_step"])
+        writes = 0
+        while time.perf_counter() < stop:
+            db.update_actions_from_df(board.sample(1, random_state=writes).assign(next_step=f"bench api {datetime.now():%H:%M:%S.%f}"))
+            writes += 1
+            time.sleep(1)
+        for t in threads:
+            t.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    total = sum(len(v) for v in samples.values())
+    out: Dict[str, Any] = {
+        "pollers": pollers,
+        "seconds": seconds,
+        "writes": writes,
+        "requests_per_s": round(total / seconds, 1),
+        "errors": len(errors),
+    }
+    for status, ms in sorted(samples.items()):
+        out[str(status)] = {
+            "requests": len(ms),
+            "p50_ms": round(statistics.median(ms), 3),
+            "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        }
+    return out
+
+
+def run(rows: List[int], repeat: int, workdir: str, batch_sizes: List[int], export: bool,
+        pollers: int = 0, writers: int = 0) -> Dict[str, Any]:
+    report: Dict[str, Any] = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "sqlite": db.engine.dialect.dbapi.sqlite_version,
+        "pandas": pd.__version__,
+        "sizes": {},
+    }
+    for n in rows:
+        path = os.path.join(workdir, f"qr1_bench_{n}.db")
+        t0 = time.perf_counter()
+        prepare_database(path, n)
+        results: Dict[str, Any] = {"prepare_s": round(time.perf_counter() - t0, 2)}
+        results["startup"] = bench_startup(path, max(1, repeat // 2))
+        results.update(bench_reads(repeat))
+        results.update(bench_analytics(repeat))
+        if export:
+            results.update(bench_export(max(1, repeat // 2)))
+        # Writes last: they modify the scratch file
+        results.update(bench_writes(repeat, batch_sizes))
+        if writers:
+            results["write burst[group commit]"] = bench_group_commit(writers)
+        results.update(bench_refresh(repeat))
+        if pollers:
+            results["api[dashboard polling]"] = bench_api(path, pollers)
+        report["sizes"][str(n)] = results
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, action="append", help="table size (repeatable), default 10000")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--batch", type=int, action="append", help="update batch size (repeatable)")
+    parser.add_argument("--workdir", default=tempfile.gettempdir(), help="where the scratch databases go")
+    parser.add_argument("--no-export", action="store_true", help="skip the export cases (slow at 1M rows)")
+    parser.add_argument("--pollers", type=int, default=200, help="displays polling api.py (0: skip)")
+    parser.add_argument("--writers", type=int, default=16, help="sessions writing at once (0: skip)")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = run(
+        rows=args.rows or [10000],
+        repeat=args.repeat,
+        workdir=args.workdir,
+        batch_sizes=args.batch or [1, 10, 100, 1000],
+        export=not args.no_export,
+        pollers=args.pollers,
+        writers=args.writers,
+    )
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
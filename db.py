@@ -1,27 +1,166 @@
 from __future__ import annotations
 
+import codecs
+import copy
+import functools
+import importlib
+import io
+import json
+import os
+import re
+import sys
+import unicodedata
+import threading
+import time
+import types
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
 from datetime import datetime, date, timedelta
-from typing import Optional, List, Dict, Any, Tuple
+from queue import Empty, SimpleQueue
+from typing import Optional, List, Dict, Any, Tuple, Iterator, Callable, TYPE_CHECKING
 
-import pandas as pd
 from sqlalchemy import (
-    create_engine, Column, Integer, String, Date, DateTime, Boolean, Text,
-    select, func, delete, update
+    create_engine, event, Column, Index, Integer, String, Date, DateTime, Boolean, Text,
+    select, insert, func, delete, update, case, and_, or_, bindparam, table, column, literal_column,
+    literal, union_all
 )
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.orm import Session, aliased, declarative_base, sessionmaker
+
+
+class _LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is only imported on first attribute access (pages that never
+    touch a DataFrame, like the home page, do not pay for pandas/numpy at startup).
+    """
+
+    # importlib.util.LazyLoader races when two threads touch the module first
+    # (gh-114763, fixed in 3.12.3); the first access here is a plain import under a lock.
+    _lock = threading.Lock()
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_qr1_module"] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__["_qr1_module"]
+        if module is None:
+            with self._lock:
+                module = self.__dict__["_qr1_module"]
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    # later lookups hit the copied attributes and skip __getattr__
+                    self.__dict__.update({k: v for k, v in vars(module).items() if k != "__name__"})
+                    self.__dict__["_qr1_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def _lazy_import(name: str):
+    if name in sys.modules:
+        return sys.modules[name]
+    return _LazyModule(name)
+
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+else:
+    np = _lazy_import("numpy")
+    pd = _lazy_import("pandas")
 
 DB_URL = "sqlite:///qr1_actions.db"
 
-engine = create_engine(DB_URL, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+# Production mode: WAL lets readers run during a write, busy_timeout makes writers wait
+# for the lock instead of failing with "database is locked".
+SQLITE_PRAGMAS: Dict[str, Any] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 15000,     # ms
+    "cache_size": -32000,      # KiB
+    "temp_store": "MEMORY",
+}
+
+
+def create_db_engine(url: str = DB_URL, production: bool = True):
+    if not production:
+        return create_engine(url, future=True)
+
+    in_memory = url in ("sqlite://", "sqlite:///") or ":memory:" in url
+    kwargs: Dict[str, Any] = {"connect_args": {"timeout": 15, "check_same_thread": False}}
+    if not in_memory:
+        kwargs.update(pool_size=10, max_overflow=20, pool_timeout=30)
+    eng = create_engine(url, future=True, **kwargs)
+
+    @event.listens_for(eng, "connect")
+    def _on_connect(dbapi_conn, _record):
+        # Transactions are begun explicitly (see _on_begin), not by the sqlite3 driver
+        dbapi_conn.isolation_level = None
+        cur = dbapi_conn.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            if name == "journal_mode" and in_memory:
+                continue
+            cur.execute(f"PRAGMA {name}={value}")
+        cur.close()
+
+    @event.listens_for(eng, "begin")
+    def _on_begin(conn):
+        # Writers ask for IMMEDIATE: the write lock is taken before their first read
+        conn.exec_driver_sql(f"BEGIN {conn.get_execution_options().get('sqlite_begin', 'DEFERRED')}")
+
+    return eng
+
+
+engine = create_db_engine(DB_URL)
+
+# Consolidated (multi-site) reads run the usual query functions against another plant's
+# database: its (site, engine) is set for the calling thread, and sessions opened there bind to it.
+_site_bind: ContextVar[Optional[Tuple[str, Engine]]] = ContextVar("qr1_site_bind", default=None)
+
+
+class _SiteSession(Session):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        bound = _site_bind.get()
+        if bound is not None:
+            kwargs["bind"] = bound[1]
+        super().__init__(*args, **kwargs)
+
+
+SessionLocal = sessionmaker(bind=engine, class_=_SiteSession, autoflush=False, autocommit=False, future=True)
 Base = declarative_base()
 
 
-# -------------------- MODELS --------------------
-class Action(Base):
-    __tablename__ = "actions"
+def use_database(url: str) -> None:
+    """
+    Points the module at another database (benchmarks, scripts). Call before any page runs.
+    """
+    global DB_URL, engine, _search_index_ready
+    engine.dispose()
+    DB_URL = url
+    engine = create_db_engine(url)
+    SessionLocal.configure(bind=engine)
+    _search_index_ready = None
+    _data_changed()
 
+
+def _write_session():
+    s = SessionLocal()
+    s.connection(execution_options={"sqlite_begin": "IMMEDIATE"})
+    return s
+
+
+# -------------------- MODELS --------------------
+class _ActionFields:
+    # Shared by the hot table and its archive
     id = Column(Integer, primary_key=True, autoincrement=True)
     action_id = Column(String(20), unique=True, index=True)  # A-0001...
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -58,6 +197,54 @@ class Action(Base):
     standard_updated = Column(Boolean, default=False)
     quality_validation_required = Column(Boolean, default=False)
 
+    row_version = Column(Integer, default=0, index=True)  # stamped by every write, see changes_since
+
+
+class Action(_ActionFields, Base):
+    __tablename__ = "actions"
+
+
+class ActionArchive(_ActionFields, Base):
+    # Closed actions moved out of "actions" by archive_actions(); ids are kept
+    __tablename__ = "actions_archive"
+
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ActionEvent(Base):
+    # Append-only workflow history, one row per creation / status or department change /
+    # archive move. Kept small: integer keys and times, the state after the event.
+    __tablename__ = "action_events"
+    __table_args__ = (Index("ix_action_events_action", "action_pk", "ts"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    action_pk = Column(Integer, nullable=False)       # actions.id (kept when archived)
+    ts = Column(Integer, nullable=False, index=True)  # Unix time, seconds (UTC)
+    kind = Column(String(10), nullable=False)         # created/status/dept/archived/restored
+    status = Column(String(20), default="")
+    dept_owner = Column(String(50), default="")
+    blockage = Column(String(200), default="")        # only while "Bloqué"
+
+
+class DailyFlow(Base):
+    # Materialized per-day aggregates of action_events (see analytics.refresh_daily_flow)
+    __tablename__ = "daily_flow"
+
+    day = Column(Date, primary_key=True)
+    status = Column(String(20), primary_key=True)
+    dept_owner = Column(String(50), primary_key=True)
+    wip = Column(Integer, default=0)       # actions in this status at the end of the day
+    entered = Column(Integer, default=0)   # transitions into this status during the day
+
+
+class ActionSignature(Base):
+    # LSH band keys of the problem text, one row per band (see NEAR-DUPLICATES)
+    __tablename__ = "action_signatures"
+    __table_args__ = (Index("ix_action_signatures_action", "action_pk"), {"sqlite_with_rowid": False})
+
+    key = Column(Integer, primary_key=True, autoincrement=False)        # bucket hash | band
+    action_pk = Column(Integer, primary_key=True, autoincrement=False)  # actions.id
+
 
 class ListValue(Base):
     __tablename__ = "list_values"
@@ -66,6 +253,297 @@ class ListValue(Base):
     value = Column(String(200), index=True)
 
 
+# -------------------- INSTRUMENTATION --------------------
+# Timings of SQL statements, db.py functions and page sections, kept in a bounded
+# in-process ring buffer (and appended as JSON lines to $QR1_PERF_LOG when set).
+PERF_BUFFER_SIZE = 5000
+PERF_LOG_PATH = os.environ.get("QR1_PERF_LOG", "")
+
+_perf_events: deque = deque(maxlen=PERF_BUFFER_SIZE)
+_perf_lock = threading.Lock()
+
+_SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SQL_IN_LISTS = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_SQL_SPACES = re.compile(r"\s+")
+
+
+def _fingerprint(statement: str) -> str:
+    # Same query shape -> same fingerprint, whatever the values and IN-list lengths
+    sql = _SQL_SPACES.sub(" ", statement).strip()
+    sql = _SQL_LITERALS.sub("?", sql)
+    return _SQL_IN_LISTS.sub("(?...)", sql)
+
+
+def _record(kind: str, name: str, ms: float, rows: Optional[int] = None) -> None:
+    event_ = {"ts": time.time(), "kind": kind, "name": name, "ms": round(ms, 3), "rows": rows}
+    with _perf_lock:
+        _perf_events.append(event_)
+        if PERF_LOG_PATH:
+            with open(PERF_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event_, ensure_ascii=False) + "\n")
+
+
+# The start time lives on the execution context: a statement that raises never reaches
+# after_cursor_execute, and nothing is left behind on the pooled connection.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._qr1_t0 = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    t0 = getattr(context, "_qr1_t0", None)
+    if t0 is None:
+        return
+    # rowcount is only known for writes; SELECT rows are counted by the function timers.
+    # SQLite produces rows while they are fetched: fetch time shows up in the function timers too.
+    rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+    _record("query", _fingerprint(statement), (time.perf_counter() - t0) * 1000, rows)
+
+
+def _timed(fn):
+    name = fn.__qualname__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        finally:
+            # shape, not isinstance(pd.DataFrame): must not force the pandas import
+            shape = getattr(result, "shape", None)
+            rows = shape[0] if shape else (len(result) if isinstance(result, list) else None)
+            _record("function", name, (time.perf_counter() - t0) * 1000, rows)
+
+    return wrapper
+
+
+@contextmanager
+def timed_section(name: str, kind: str = "section"):
+    """
+    with timed_section("Dashboard · KPIs"): ...   (recorded even if the block raises / st.stop())
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(kind, name, (time.perf_counter() - t0) * 1000)
+
+
+class PageTimer:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.t0 = time.perf_counter()
+
+    def done(self) -> None:
+        _record("page", self.name, (time.perf_counter() - self.t0) * 1000)
+
+
+def page_timer(name: str) -> PageTimer:
+    """
+    Whole-page render time: create at the top of the page, call .done() at the end (and before st.stop()).
+    """
+    return PageTimer(name)
+
+
+def perf_events(kind: Optional[str] = None) -> pd.DataFrame:
+    with _perf_lock:
+        events = list(_perf_events)
+    df = pd.DataFrame(events, columns=["ts", "kind", "name", "ms", "rows"])
+    if kind:
+        df = df[df["kind"] == kind]
+    df["ts"] = pd.to_datetime(df["ts"], unit="s")
+    return df.reset_index(drop=True)
+
+
+def perf_summary(kind: str) -> pd.DataFrame:
+    """
+    Per name: count, p50/p95/max ms and total ms, slowest p95 first.
+    """
+    df = perf_events(kind)
+    cols = ["name", "count", "p50_ms", "p95_ms", "max_ms", "total_ms"]
+    if df.empty:
+        return pd.DataFrame(columns=cols)
+    g = df.groupby("name")["ms"]
+    out = pd.DataFrame({
+        "count": g.size(),
+        "p50_ms": g.quantile(0.5),
+        "p95_ms": g.quantile(0.95),
+        "max_ms": g.max(),
+        "total_ms": g.sum(),
+    }).reset_index()
+    return out[cols].sort_values("p95_ms", ascending=False).round(3).reset_index(drop=True)
+
+
+def slowest_queries(limit: int = 20) -> pd.DataFrame:
+    return perf_events("query").sort_values("ms", ascending=False).head(limit).reset_index(drop=True)
+
+
+def clear_perf() -> None:
+    with _perf_lock:
+        _perf_events.clear()
+
+
+# -------------------- QUERY CACHE --------------------
+# Process-wide: every Streamlit session of the process shares it. Entries are keyed on the
+# data generation, which each write path bumps, so readers never see stale results.
+QUERY_CACHE_SIZE = 128
+
+
+class _QueryCache:
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Tuple[bool, Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def bump(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "generation": self.generation,
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_cache = _QueryCache(QUERY_CACHE_SIZE)
+# Full texts of single actions (get_action_details), same generation rule
+DETAILS_CACHE_SIZE = 512
+_details_cache = _QueryCache(DETAILS_CACHE_SIZE)
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def _cached(fn):
+    name = fn.__qualname__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        # The day is part of the key: is_late / closed_7d depend on it
+        key = (name, sync_data_version(), _site_key(), date.today(), _freeze(args), _freeze(kwargs))
+        hit, value = _cache.get(key)
+        if not hit:
+            value = fn(*args, **kwargs)
+            _cache.put(key, value)
+        # Callers get their own copy (DataFrames are mutable)
+        return copy.deepcopy(value)
+
+    return wrapper
+
+
+def _data_changed() -> None:
+    _cache.bump()
+    _details_cache.bump()
+
+
+def data_version() -> int:
+    return _cache.generation
+
+
+# Writes of other processes (another server, the JSON service, scripts) do not bump this
+# process's generation. PRAGMA data_version on a connection kept for the purpose shows
+# them: it changes whenever another connection commits, same-second writes included.
+_watch: Optional[Tuple[Engine, Any]] = None      # (engine, DBAPI connection)
+_storage_version: Optional[int] = None
+_storage_lock = threading.Lock()
+
+
+def _database_files(eng: Optional[Engine] = None) -> List[str]:
+    url = (eng or engine).url
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        return []
+    return [url.database, url.database + "-wal"]
+
+
+def _stat(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _site_key() -> Optional[Tuple[Any, ...]]:
+    # Another plant's database is written by its own app: its results are keyed on its files
+    bound = _site_bind.get()
+    if bound is None:
+        return None
+    return (bound[0],) + tuple(_stat(p) for p in _database_files(bound[1]))
+
+
+def sync_data_version() -> int:
+    """
+    data_version(), bumped first if another connection committed since the last call.
+    One PRAGMA on an open connection: cheap enough for every cached read.
+    """
+    global _watch, _storage_version
+    if not _database_files():
+        return data_version()
+    with _storage_lock:
+        if _watch is None or _watch[0] is not engine:
+            if _watch is not None:
+                _watch[1].close()
+            _watch, _storage_version = (engine, engine.raw_connection()), None
+        cur = _watch[1].cursor()
+        try:
+            version = cur.execute("PRAGMA data_version").fetchone()[0]
+        finally:
+            cur.close()
+        if version != _storage_version:
+            if _storage_version is not None:
+                _data_changed()
+            _storage_version = version
+    return data_version()
+
+
+def cache_stats() -> Dict[str, Any]:
+    return _cache.stats()
+
+
+def clear_cache() -> None:
+    _cache.bump()
+    _details_cache.bump()
+
+
 # -------------------- INIT / SEED --------------------
 DEFAULT_LISTS: Dict[str, List[str]] = {
     "departments": ["ASSY", "Lean", "Maintenance", "Engi", "Qualité"],
@@ -86,13 +564,30 @@ DEFAULT_LISTS: Dict[str, List[str]] = {
 }
 
 
+_initialized: set = set()
+_init_lock = threading.Lock()
+
+
+@_timed
 def init_db() -> None:
-    Base.metadata.create_all(bind=engine)
-    seed_default_lists()
+    """
+    Once per process and database file; the schema work is skipped when user_version is current.
+    """
+    if DB_URL in _initialized:
+        return
+    with _init_lock:
+        if DB_URL in _initialized:
+            return
+        if schema_version() < SCHEMA_VERSION:
+            Base.metadata.create_all(bind=engine)
+            _ensure_search_index()
+            migrate()
+        seed_default_lists()
+        _initialized.add(DB_URL)
 
 
 def seed_default_lists() -> None:
-    with SessionLocal() as s:
+    with _write_session() as s:
         existing = s.execute(select(func.count(ListValue.id))).scalar_one()
         if existing and existing > 0:
             return
@@ -100,8 +595,11 @@ def seed_default_lists() -> None:
             for v in vals:
                 s.add(ListValue(list_name=list_name, value=v))
         s.commit()
+    _data_changed()
 
 
+@_timed
+@_cached
 def get_list(list_name: str) -> List[str]:
     with SessionLocal() as s:
         rows = s.execute(
@@ -110,11 +608,21 @@ def get_list(list_name: str) -> List[str]:
     return [r[0] for r in rows]
 
 
+def list_domain(list_name: str) -> List[str]:
+    """
+    Values of a list in their intended order: the default order first (status workflow,
+    P1 < P2 < P3...), then values added later, alphabetically.
+    """
+    rank = {v: i for i, v in enumerate(DEFAULT_LISTS.get(list_name, []))}
+    return sorted(get_list(list_name), key=lambda v: (rank.get(v, len(rank)), v))
+
+
+@_timed
 def add_list_value(list_name: str, value: str) -> None:
     value = value.strip()
     if not value:
         return
-    with SessionLocal() as s:
+    with _write_session() as s:
         exists = s.execute(
             select(ListValue.id).where(ListValue.list_name == list_name, ListValue.value == value)
         ).first()
@@ -122,23 +630,245 @@ def add_list_value(list_name: str, value: str) -> None:
             return
         s.add(ListValue(list_name=list_name, value=value))
         s.commit()
+    _data_changed()
 
 
+@_timed
 def delete_list_value(list_name: str, value: str) -> None:
-    with SessionLocal() as s:
+    with _write_session() as s:
         s.execute(delete(ListValue).where(ListValue.list_name == list_name, ListValue.value == value))
         s.commit()
+    _data_changed()
+
+
+# -------------------- MIGRATIONS --------------------
+# Upgrade existing databases in place. PRAGMA user_version holds the last migration applied;
+# each migration runs in its own write transaction together with the version bump.
+def _m001_query_indexes(conn) -> None:
+    open_where = "WHERE status NOT IN (" + ", ".join("'" + v.replace("'", "''") + "'" for v in CLOSED_STATUSES) + ")"
+    for ddl in [
+        # Board order (list_actions, keyset pages)
+        "CREATE INDEX IF NOT EXISTS ix_actions_board ON actions (priority, due_date IS NULL, due_date, id DESC)",
+        # Board order restricted to open actions (only_open, top priorities)
+        "CREATE INDEX IF NOT EXISTS ix_actions_open_board "
+        f"ON actions (priority, due_date IS NULL, due_date, id DESC) {open_where}",
+        # Pareto of open actions by type, per department
+        f"CREATE INDEX IF NOT EXISTS ix_actions_open_type ON actions (type, dept_owner) {open_where}",
+        # KPIs (covering), status filter, recent closures
+        "CREATE INDEX IF NOT EXISTS ix_actions_status ON actions (status, closed_at, due_date)",
+        # Department / type filters and their counts
+        "CREATE INDEX IF NOT EXISTS ix_actions_dept_type ON actions (dept_owner, type, status)",
+    ]:
+        conn.exec_driver_sql(ddl)
+    conn.exec_driver_sql("ANALYZE actions")
+
+
+def _m002_actions_archive(conn) -> None:
+    ActionArchive.__table__.create(conn, checkfirst=True)
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_actions_archive_closed ON actions_archive (closed_at)"
+    )
+
+
+def _m003_row_version(conn) -> None:
+    for name in ("actions", "actions_archive"):
+        existing = {r[1] for r in conn.exec_driver_sql(f"PRAGMA table_info({name})").all()}
+        if "row_version" not in existing:
+            conn.exec_driver_sql(f"ALTER TABLE {name} ADD COLUMN row_version INTEGER DEFAULT 0")
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS ix_{name}_row_version ON {name} (row_version)")
+
+
+def _m004_action_events(conn) -> None:
+    ActionEvent.__table__.create(conn, checkfirst=True)
+    DailyFlow.__table__.create(conn, checkfirst=True)
+    if conn.exec_driver_sql("SELECT 1 FROM action_events LIMIT 1").first():
+        return
+    # Backfill from what the rows still tell: the creation, and the closing date of "Fait"
+    created = "CAST(strftime('%s', COALESCE(created_at, CURRENT_TIMESTAMP)) AS INTEGER)"
+    for name in ("actions", "actions_archive"):
+        conn.exec_driver_sql(
+            "INSERT INTO action_events (action_pk, ts, kind, status, dept_owner, blockage) "
+            f"SELECT id, {created}, 'created', "
+            "CASE WHEN status = 'Fait' AND closed_at IS NOT NULL THEN 'À faire' ELSE status END, "
+            "dept_owner, CASE WHEN status = 'Bloqué' THEN blockage ELSE '' END "
+            f"FROM {name}"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO action_events (action_pk, ts, kind, status, dept_owner, blockage) "
+            f"SELECT id, MAX(CAST(strftime('%s', closed_at) AS INTEGER), {created}), 'status', 'Fait', "
+            f"dept_owner, '' FROM {name} WHERE status = 'Fait' AND closed_at IS NOT NULL"
+        )
+
+
+def _m005_action_signatures(conn) -> None:
+    ActionSignature.__table__.create(conn, checkfirst=True)
+    if conn.exec_driver_sql("SELECT 1 FROM action_signatures LIMIT 1").first():
+        return
+    last = 0
+    while True:
+        rows = conn.exec_driver_sql(
+            "SELECT id, problem FROM actions WHERE id > ? ORDER BY id LIMIT ?", (last, SIGNATURE_BATCH)
+        ).all()
+        if not rows:
+            break
+        _index_signatures(conn, [r[0] for r in rows], [r[1] for r in rows], replace=False)
+        last = rows[-1][0]
+
+
+# A new table or column needs a migration too: init_db() skips create_all when the
+# version is current.
+MIGRATIONS: List[Tuple[int, str, Callable[[Any], None]]] = [
+    (1, "Index des requêtes tableau / KPI / filtres", _m001_query_indexes),
+    (2, "Table d’archive des actions clôturées", _m002_actions_archive),
+    (3, "Version de ligne (rafraîchissement incrémental)", _m003_row_version),
+    (4, "Historique des événements (flux, délais)", _m004_action_events),
+    (5, "Signatures de similarité (doublons)", _m005_action_signatures),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version() -> int:
+    with engine.connect() as conn:
+        return int(conn.exec_driver_sql("PRAGMA user_version").scalar_one())
+
+
+@_timed
+def migrate() -> List[int]:
+    """
+    Applies the pending migrations, returns the versions applied.
+    """
+    applied: List[int] = []
+    if schema_version() >= SCHEMA_VERSION:
+        return applied
+
+    for version, _name, upgrade in MIGRATIONS:
+        with engine.connect() as conn:
+            conn = conn.execution_options(sqlite_begin="IMMEDIATE")
+            with conn.begin():
+                # Re-read under the write lock: another process may have migrated meanwhile
+                if int(conn.exec_driver_sql("PRAGMA user_version").scalar_one()) >= version:
+                    continue
+                upgrade(conn)
+                conn.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+        applied.append(version)
+
+    if applied:
+        _data_changed()
+    return applied
+
+
+def explain_query_plan(stmt) -> List[str]:
+    """
+    SQLite's plan for a SELECT statement, one line per step (parameters are inlined).
+    """
+    sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        return [r[3] for r in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql).all()]
 
 
 # -------------------- ACTION ID --------------------
+# Ids are never reused: archived rows keep theirs, so the next id is taken above both tables.
+def _last_id(s) -> int:
+    hot = select(func.max(Action.id)).scalar_subquery()
+    archived = select(func.max(ActionArchive.id)).scalar_subquery()
+    return s.execute(select(func.max(func.coalesce(hot, 0), func.coalesce(archived, 0)))).scalar_one()
+
+
+@_timed
 def next_action_id() -> str:
+    """
+    Preview only: the ID actually stored is allocated by create_action, inside its transaction.
+    """
     with SessionLocal() as s:
-        last = s.execute(select(func.max(Action.id))).scalar_one()
-    n = (last or 0) + 1
+        n = _last_id(s) + 1
     return f"A-{n:04d}"
 
 
+def _allocate_ids(s, count: int) -> List[int]:
+    # Runs in a write (BEGIN IMMEDIATE) transaction: no other writer can insert between
+    # reading max(id) and inserting the new rows. Rows are inserted with these ids.
+    last = _last_id(s)
+    return list(range(last + 1, last + count + 1))
+
+
+def _format_action_id(pk: int) -> str:
+    return f"A-{pk:04d}"
+
+
+def _last_version(s) -> int:
+    hot = select(func.max(Action.row_version)).scalar_subquery()
+    archived = select(func.max(ActionArchive.row_version)).scalar_subquery()
+    return s.execute(select(func.max(func.coalesce(hot, 0), func.coalesce(archived, 0)))).scalar_one()
+
+
+def _next_version(s) -> int:
+    # One version per write transaction, taken under the write lock like the ids
+    return _last_version(s) + 1
+
+
+# -------------------- EVENTS --------------------
+# Every write path appends to action_events in its own transaction (see ActionEvent).
+EVENT_COLUMNS = ["action_pk", "ts", "kind", "status", "dept_owner", "blockage"]
+
+
+def _epoch(values: pd.Series) -> pd.Series:
+    # dates / naive UTC datetimes -> Unix seconds (NaN when missing)
+    d = pd.to_datetime(values, errors="coerce")
+    return (d - pd.Timestamp("1970-01-01")) // pd.Timedelta(seconds=1)
+
+
+def _initial_events(rows: pd.DataFrame, now: int) -> pd.DataFrame:
+    """
+    Events of newly inserted actions (columns id, created_at, closed_at, status, dept_owner,
+    blockage): created, plus the closing for rows that arrive already "Fait".
+    """
+    created = _epoch(rows["created_at"]).fillna(now).astype("int64")
+    closed = _epoch(rows["closed_at"])
+    done = (rows["status"] == "Fait") & closed.notna()
+    first = pd.DataFrame({
+        "action_pk": rows["id"],
+        "ts": created,
+        "kind": "created",
+        "status": rows["status"].where(~done, "À faire"),
+        "dept_owner": rows["dept_owner"],
+        "blockage": rows["blockage"].where(rows["status"] == "Bloqué", ""),
+    })
+    closing = pd.DataFrame({
+        "action_pk": rows.loc[done, "id"],
+        "ts": np.maximum(closed[done].astype("int64"), created[done]),
+        "kind": "status",
+        "status": "Fait",
+        "dept_owner": rows.loc[done, "dept_owner"],
+        "blockage": "",
+    })
+    return pd.concat([first, closing], ignore_index=True)[EVENT_COLUMNS]
+
+
+def _log_events(s, events: pd.DataFrame) -> None:
+    if events.empty:
+        return
+    records = events[EVENT_COLUMNS].astype(object).where(events[EVENT_COLUMNS].notna(), "").to_dict("records")
+    s.execute(insert(ActionEvent), records)
+    # Back-dated events (imports) make the materialized days after them stale
+    first_day = date(1970, 1, 1) + timedelta(days=int(events["ts"].min()) // 86400)
+    if first_day < datetime.utcnow().date():
+        s.execute(delete(DailyFlow).where(DailyFlow.day >= first_day))
+
+
 # -------------------- VALIDATION RULES (LEAN) --------------------
+LEAN_MESSAGES: Dict[str, str] = {
+    "owner_name": "Responsable obligatoire.",
+    "dept_owner": "Département responsable obligatoire.",
+    "due_date": "Échéance obligatoire.",
+    "next_step": "Prochaine étape obligatoire si Statut = En cours / Bloqué.",
+    "blockage": "Blocage obligatoire si Statut = Bloqué.",
+    "proof_link": "Preuve (lien) recommandée pour clôturer (Statut = Fait).",
+    # Form-level rules (new action / import)
+    "problem": "Le problème est obligatoire.",
+    "countermeasure": "L’action / contre-mesure est obligatoire.",
+}
+
+
 def validate_action_fields(
     status: str,
     owner_name: str,
@@ -149,166 +879,2049 @@ def validate_action_fields(
     proof_link: str,
 ) -> Tuple[bool, str]:
     if not owner_name.strip():
-        return False, "Responsable obligatoire."
+        return False, LEAN_MESSAGES["owner_name"]
     if not dept_owner.strip():
-        return False, "Département responsable obligatoire."
+        return False, LEAN_MESSAGES["dept_owner"]
     if due_date is None:
-        return False, "Échéance obligatoire."
+        return False, LEAN_MESSAGES["due_date"]
 
     if status in ["En cours", "Bloqué"] and not next_step.strip():
-        return False, "Prochaine étape obligatoire si Statut = En cours / Bloqué."
+        return False, LEAN_MESSAGES["next_step"]
 
     if status == "Bloqué" and not blockage.strip():
-        return False, "Blocage obligatoire si Statut = Bloqué."
+        return False, LEAN_MESSAGES["blockage"]
 
     if status == "Fait" and not proof_link.strip():
-        return False, "Preuve (lien) recommandée pour clôturer (Statut = Fait)."
+        return False, LEAN_MESSAGES["proof_link"]
 
     return True, ""
 
 
-# -------------------- CRUD --------------------
-def create_action(payload: Dict[str, Any]) -> None:
-    with SessionLocal() as s:
-        s.add(Action(**payload))
-        s.commit()
+VIOLATION_COLUMNS = ["row", "field", "message"]
 
 
-def list_actions(filters: Dict[str, Any] | None = None) -> pd.DataFrame:
-    filters = filters or {}
-    stmt = select(Action)
+def validate_actions_df(df: pd.DataFrame, require_text: bool = False) -> pd.DataFrame:
+    """
+    The rules of validate_action_fields over a whole frame, one column operation per rule.
 
-    # Filters
-    if filters.get("dept_owner") and filters["dept_owner"] != "Tous":
-        stmt = stmt.where(Action.dept_owner == filters["dept_owner"])
-    if filters.get("type") and filters["type"] != "Tous":
-        stmt = stmt.where(Action.type == filters["type"])
-    if filters.get("status") and filters["status"] != "Tous":
-        stmt = stmt.where(Action.status == filters["status"])
-    if filters.get("priority") and filters["priority"] != "Tous":
-        stmt = stmt.where(Action.priority == filters["priority"])
-    if filters.get("only_open"):
-        stmt = stmt.where(Action.status.notin_(["Fait", "Annulé"]))
+    Returns one line per violation (row = index label in `df`, field, message), every
+    violation of a row rather than only the first; empty when all rows are valid.
+    `require_text` adds the form rules (problem and countermeasure mandatory).
+    """
+    def blank(col: str) -> pd.Series:
+        if col not in df.columns:
+            return pd.Series(True, index=df.index)
+        return df[col].isna() | (df[col].astype(str).str.strip() == "")
 
-    # Search (problem/countermeasure)
-    q = (filters.get("search") or "").strip()
-    if q:
-        like = f"%{q}%"
-        stmt = stmt.where((Action.problem.like(like)) | (Action.countermeasure.like(like)))
+    status = df["status"].fillna("").astype(str) if "status" in df.columns else pd.Series("", index=df.index)
+    rules = [
+        ("owner_name", blank("owner_name")),
+        ("dept_owner", blank("dept_owner")),
+        ("due_date", df["due_date"].isna() if "due_date" in df.columns else blank("due_date")),
+        ("next_step", status.isin(["En cours", "Bloqué"]) & blank("next_step")),
+        ("blockage", (status == "Bloqué") & blank("blockage")),
+        ("proof_link", (status == "Fait") & blank("proof_link")),
+    ]
+    if require_text:
+        rules += [("problem", blank("problem")), ("countermeasure", blank("countermeasure"))]
 
-    stmt = stmt.order_by(Action.priority.asc(), Action.due_date.asc().nullslast(), Action.id.desc())
+    hits = [np.flatnonzero(mask.to_numpy()) for _, mask in rules]
+    pos = np.concatenate(hits)
+    if not len(pos):
+        return pd.DataFrame(columns=VIOLATION_COLUMNS)
 
-    with SessionLocal() as s:
-        rows = s.execute(stmt).scalars().all()
-
-    data = []
-    for a in rows:
-        data.append({
-            "action_id": a.action_id,
-            "created_at": a.created_at,
-            "created_by": a.created_by,
-            "zone": a.zone,
-            "line": a.line,
-            "machine": a.machine,
-            "type": a.type,
-            "m6": a.m6,
-            "problem": a.problem,
-            "impact": a.impact,
-            "containment": a.containment,
-            "root_cause": a.root_cause,
-            "countermeasure": a.countermeasure,
-            "action_kind": a.action_kind,
-            "dept_owner": a.dept_owner,
-            "owner_name": a.owner_name,
-            "support_needed": a.support_needed,
-            "priority": a.priority,
-            "due_date": a.due_date,
-            "status": a.status,
-            "blockage": a.blockage,
-            "next_step": a.next_step,
-            "closed_at": a.closed_at,
-            "proof_link": a.proof_link,
-            "standard_updated": bool(a.standard_updated),
-            "quality_validation_required": bool(a.quality_validation_required),
-        })
+    # Row position first, then rule order; field/message are looked up by rule number
+    rule = np.repeat(np.arange(len(rules)), [len(h) for h in hits])
+    order = np.lexsort((rule, pos))
+    rule = rule[order]
+    fields = np.array([field for field, _ in rules], dtype=object)
+    messages = np.array([LEAN_MESSAGES[field] for field, _ in rules], dtype=object)
+    return pd.DataFrame({
+        "row": df.index[pos[order]],
+        "field": fields[rule],
+        "message": messages[rule],
+    })
 
-    df = pd.DataFrame(data)
-    if df.empty:
-        return df
 
-    today = date.today()
-    df["is_late"] = df.apply(
-        lambda r: (r["status"] not in ["Fait", "Annulé"]) and pd.notna(r["due_date"]) and (r["due_date"] < today),
-        axis=1,
-    )
-    df["age_days"] = (pd.to_datetime(today) - pd.to_datetime(df["created_at"]).dt.normalize()).dt.days
-    return df
+def violation_grid(df: pd.DataFrame, violations: pd.DataFrame) -> pd.DataFrame:
+    """
+    Violations laid out like `df` (same index and columns): the message where a cell
+    breaks a rule, "" elsewhere. Meant for cell highlighting in the editor.
+    """
+    values = np.full(df.shape, "", dtype=object)
+    hits = violations[violations["field"].isin(df.columns)]
+    if len(hits):
+        rows = df.index.get_indexer(hits["row"])
+        cols = df.columns.get_indexer(hits["field"])
+        values[rows, cols] = hits["message"].to_numpy()
+    return pd.DataFrame(values, index=df.index, columns=df.columns, dtype=object)
+
+
+# -------------------- FULL-TEXT SEARCH --------------------
+# External-content FTS5 index over the action text fields, kept in sync by triggers.
+# unicode61 + remove_diacritics: "qualite" matches "Qualité".
+SEARCH_FIELDS = ["problem", "countermeasure", "root_cause", "containment", "next_step"]
+
+_fts = table("actions_fts", column("rowid"), column("rank"))
+_search_index_ready: Optional[bool] = None   # unknown until first checked
+_site_search_index: Dict[str, bool] = {}     # same, per site (consolidated reads)
 
 
-def update_actions_from_df(df_updates: pd.DataFrame) -> None:
+def _search_index_ddl() -> List[str]:
+    cols = ", ".join(SEARCH_FIELDS)
+    new_vals = ", ".join(f"new.{f}" for f in SEARCH_FIELDS)
+    old_vals = ", ".join(f"old.{f}" for f in SEARCH_FIELDS)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS actions_fts USING fts5({cols}, "
+        f"content='actions', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS actions_fts_ai AFTER INSERT ON actions BEGIN "
+        f"INSERT INTO actions_fts(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS actions_fts_ad AFTER DELETE ON actions BEGIN "
+        f"INSERT INTO actions_fts(actions_fts, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS actions_fts_au AFTER UPDATE OF {cols} ON actions BEGIN "
+        f"INSERT INTO actions_fts(actions_fts, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); "
+        f"INSERT INTO actions_fts(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+    ]
+
+
+def _ensure_search_index() -> bool:
     """
-    df_updates must include 'action_id' and fields to update.
+    Creates the index (and fills it from existing rows) if missing.
+    Returns False when SQLite is built without FTS5: search then falls back to LIKE.
     """
-    if df_updates.empty:
-        return
+    global _search_index_ready
+    try:
+        with engine.begin() as conn:
+            existed = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'actions_fts'"
+            ).first()
+            for ddl in _search_index_ddl():
+                conn.exec_driver_sql(ddl)
+            if not existed:
+                conn.exec_driver_sql("INSERT INTO actions_fts(actions_fts) VALUES ('rebuild')")
+    except OperationalError:
+        _search_index_ready = False
+        return False
+    _search_index_ready = True
+    return True
 
-    with SessionLocal() as s:
-        for _, r in df_updates.iterrows():
-            a = s.execute(select(Action).where(Action.action_id == r["action_id"])).scalar_one_or_none()
-            if not a:
-                continue
 
-            # Apply updates (only keys we expect)
-            for k in [
-                "dept_owner", "owner_name", "support_needed", "priority", "due_date",
-                "status", "blockage", "next_step", "proof_link",
-                "standard_updated", "quality_validation_required",
-            ]:
-                if k in r:
-                    setattr(a, k, r[k])
-
-            # Auto close date when "Fait"
-            if a.status == "Fait" and a.closed_at is None:
-                a.closed_at = date.today()
-            if a.status != "Fait":
-                a.closed_at = None
+def _has_search_table(eng: Engine) -> bool:
+    with eng.connect() as conn:
+        return conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'actions_fts'"
+        ).first() is not None
 
-        s.commit()
 
+def _search_index_available() -> bool:
+    global _search_index_ready
+    bound = _site_bind.get()
+    if bound is not None:
+        site, eng = bound
+        if site not in _site_search_index:
+            _site_search_index[site] = _has_search_table(eng)
+        return _site_search_index[site]
+    if _search_index_ready is None:
+        _search_index_ready = _has_search_table(engine)
+    return _search_index_ready
 
-# -------------------- DASHBOARD QUERIES --------------------
-def kpis() -> Dict[str, Any]:
-    today = date.today()
-    last7 = today - timedelta(days=7)
+
+def rebuild_search_index() -> None:
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO actions_fts(actions_fts) VALUES ('rebuild')")
+    _data_changed()
+
+
+def _fts_query(q: str) -> Optional[str]:
+    # Every word must appear, as a prefix ("rayu" matches "rayure")
+    words = re.findall(r"\w+", q)
+    if not words:
+        return None
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def _fts_match(match: str):
+    return literal_column("actions_fts").op("MATCH")(match)
+
+
+@_timed
+@_cached
+def search_actions(
+    query: str,
+    filters: Dict[str, Any] | None = None,
+    columns: Optional[List[str]] = None,
+    limit: int = 50,
+) -> pd.DataFrame:
+    """
+    Best matches first (bm25), with a `rank` column (lower is better).
+    `filters` are applied as in list_actions, except `search`.
+    """
+    filters = {k: v for k, v in (filters or {}).items() if k != "search"}
+    match = _fts_query(query) if _search_index_available() else None
+    if not match:
+        df = list_actions({**filters, "search": query}, columns=columns).head(limit)
+        df["rank"] = 0.0
+        return df
+
+    wanted, fetched = _projection(columns)
+    stmt = select(*[_column(Action, c) for c in fetched], _fts.c.rank).join(_fts, _fts.c.rowid == Action.id)
+    stmt = _apply_filters(stmt.where(_fts_match(match)), filters)
+    stmt = stmt.order_by(_fts.c.rank).limit(limit)
 
     with SessionLocal() as s:
-        total_open = s.execute(
-            select(func.count(Action.id)).where(Action.status.notin_(["Fait", "Annulé"]))
-        ).scalar_one()
-
-        total_late = s.execute(
-            select(func.count(Action.id)).where(
-                Action.status.notin_(["Fait", "Annulé"]),
-                Action.due_date.isnot(None),
-                Action.due_date < today
-            )
-        ).scalar_one()
-
-        total_blocked = s.execute(
-            select(func.count(Action.id)).where(Action.status == "Bloqué")
-        ).scalar_one()
-
-        closed_7d = s.execute(
-            select(func.count(Action.id)).where(
-                Action.status == "Fait",
-                Action.closed_at.isnot(None),
-                Action.closed_at >= last7
-            )
-        ).scalar_one()
+        rows = s.execute(stmt).all()
 
-    return {
-        "open": int(total_open or 0),
-        "late": int(total_late or 0),
-        "blocked": int(total_blocked or 0),
-        "closed_7d": int(closed_7d or 0),
-    }
+    df = _actions_frame([r[:-1] for r in rows], fetched, wanted)
+    df["rank"] = [r[-1] for r in rows]
+    return df
+
+
+# -------------------- NEAR-DUPLICATES --------------------
+# MinHash over the character trigrams of the problem text, banded for LSH: two texts share
+# a band key with probability J^ROWS (J = trigram Jaccard), so near-duplicates meet in at
+# least one of the SIGNATURE_BANDS buckets while unrelated texts rarely do. Lookups read a
+# few small buckets through the primary key instead of comparing with every action.
+SIGNATURE_BANDS = 10
+SIGNATURE_ROWS = 3
+SIGNATURE_BATCH = 2000
+
+
+@functools.lru_cache(maxsize=1)
+def _minhash_params() -> Tuple[np.ndarray, np.ndarray]:
+    # Multiply-shift hashes (odd a, any b, wrapping uint64). Fixed seed: stored keys must
+    # stay comparable across processes and restarts.
+    rng = np.random.default_rng(20230623)
+    a, b = rng.integers(0, 1 << 63, (2, SIGNATURE_BANDS * SIGNATURE_ROWS), dtype=np.uint64)
+    return a | np.uint64(1), b
+
+
+def _normalize_text(text: Any) -> str:
+    # "Rayure  sur PIÈCE!" -> " rayure sur piece ": accents, case and punctuation ignored
+    plain = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode()
+    words = re.findall(r"[a-z0-9]+", plain.lower())
+    return f" {' '.join(words)} " if words else ""
+
+
+def _trigrams(text: Any) -> np.ndarray:
+    b = np.frombuffer(_normalize_text(text).encode(), dtype=np.uint8).astype(np.int64)
+    if len(b) < 3:
+        return np.empty(0, dtype=np.int64)
+    return np.unique(b[:-2] << 16 | b[1:-1] << 8 | b[2:])
+
+
+def _jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    if not len(a) or not len(b):
+        return 0.0
+    common = len(np.intersect1d(a, b, assume_unique=True))
+    return common / (len(a) + len(b) - common)
+
+
+def _minhash(texts: List[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    MinHash signatures of the non-empty texts: their positions in `texts`, and one row of
+    SIGNATURE_BANDS * SIGNATURE_ROWS values each.
+    """
+    # All texts in one buffer: trigrams that straddle two texts are dropped, then the
+    # (text, trigram) codes are sorted and deduplicated together
+    norm = [_normalize_text(t) for t in texts]
+    owner = np.repeat(np.arange(len(norm), dtype=np.int64), [len(t) for t in norm])
+    buf = np.frombuffer("".join(norm).encode(), dtype=np.uint8).astype(np.int64)
+    inside = owner[:-2] == owner[2:]
+    pairs = np.sort(owner[:-2][inside] << 24 | (buf[:-2] << 16 | buf[1:-1] << 8 | buf[2:])[inside])
+    pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])]
+    a, b = _minhash_params()
+    if not len(pairs):
+        return np.empty(0, dtype=np.int64), np.empty((0, len(a)), dtype=np.uint64)
+    keep, starts = np.unique(pairs >> 24, return_index=True)
+    hashed = ((pairs & 0xFFFFFF).astype(np.uint64)[:, None] * a + b) >> np.uint64(32)
+    return keep, np.minimum.reduceat(hashed, starts, axis=0)
+
+
+def _band_keys(texts: List[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    LSH keys of the texts: (position in `texts`, key) pairs, SIGNATURE_BANDS per non-empty text.
+    """
+    keep, sig = _minhash(texts)
+    sig = sig.reshape(len(keep), SIGNATURE_BANDS, SIGNATURE_ROWS)
+    # Fold the rows of each band into one bucket (FNV-style, wrapping), band in the low bits
+    bucket = np.zeros((len(keep), SIGNATURE_BANDS), dtype=np.uint64)
+    for r in range(SIGNATURE_ROWS):
+        bucket = bucket * np.uint64(0x100000001B3) ^ sig[:, :, r]
+    keys = (bucket >> np.uint64(7)) << np.uint64(5) | np.arange(SIGNATURE_BANDS, dtype=np.uint64)
+    return np.repeat(keep, SIGNATURE_BANDS), keys.astype(np.int64).ravel()
+
+
+def _index_signatures(s, pks: List[int], texts: List[Any], replace: bool = True) -> None:
+    # Runs in the write transaction that inserts the actions (the problem text is not
+    # editable afterwards). `replace` drops previous keys first (restored rows).
+    t = ActionSignature.__table__
+    if replace:
+        for i in range(0, len(pks), _IN_CHUNK):
+            s.execute(delete(t).where(t.c.action_pk.in_(pks[i:i + _IN_CHUNK])))
+    for i in range(0, len(pks), SIGNATURE_BATCH):
+        pos, keys = _band_keys(texts[i:i + SIGNATURE_BATCH])
+        owners = np.asarray(pks[i:i + SIGNATURE_BATCH], dtype=np.int64)[pos]
+        if len(keys):
+            s.execute(insert(t), [{"key": int(k), "action_pk": int(p)} for k, p in zip(keys, owners)])
+
+
+SIMILAR_COLUMNS = ["action_id", "status", "zone", "machine", "dept_owner", "owner_name", "problem_preview"]
+SIMILAR_CANDIDATES = 50
+SIMILAR_BUCKET_LIMIT = 1000   # most recent actions read per bucket (bounds boilerplate text)
+
+
+@_timed
+@_cached
+def similar_actions(problem: str, limit: int = 5, only_open: bool = True, min_score: float = 0.2) -> pd.DataFrame:
+    """
+    Actions whose problem text looks like `problem`, best first: SIMILAR_COLUMNS and `score`
+    (exact trigram Jaccard of the LSH candidates, 0..1). Meant for the new action form.
+    """
+    columns = SIMILAR_COLUMNS + ["score"]
+    grams = _trigrams(problem)
+    _, keys = _band_keys([problem])
+    if not len(keys):
+        return pd.DataFrame(columns=columns)
+
+    sig = ActionSignature.__table__
+    buckets = [
+        select(sig.c.action_pk).where(sig.c.key == int(k)).order_by(sig.c.action_pk.desc())
+        .limit(SIMILAR_BUCKET_LIMIT).subquery()
+        for k in keys
+    ]
+    found = union_all(*[select(b.c.action_pk) for b in buckets]).subquery()
+    hits = func.count().label("hits")
+    stmt = (
+        select(Action.id, Action.problem, *[_column(Action, c) for c in SIMILAR_COLUMNS], hits)
+        .join(found, found.c.action_pk == Action.id)
+        .group_by(Action.id)
+        .order_by(hits.desc(), Action.id.desc())
+        .limit(SIMILAR_CANDIDATES)
+    )
+    if only_open:
+        stmt = stmt.where(_is_open())
+    with SessionLocal() as s:
+        rows = s.execute(stmt).all()
+
+    df = pd.DataFrame([r[2:-1] for r in rows], columns=SIMILAR_COLUMNS)
+    df["score"] = [round(_jaccard(grams, _trigrams(r[1])), 3) for r in rows]
+    df = df[df["score"] >= min_score].sort_values("score", ascending=False, kind="stable")
+    return df.head(limit).reset_index(drop=True)
+
+
+def _bucket_pairs(keys: np.ndarray, pks: np.ndarray, max_bucket: int) -> np.ndarray:
+    # (key, action_pk) rows sorted by key then pk -> distinct (x, y) pairs, x < y, of the
+    # actions sharing a bucket of at most max_bucket actions
+    first = np.concatenate([[True], keys[1:] != keys[:-1]])
+    sizes = np.diff(np.append(np.flatnonzero(first), len(keys)))
+    size = np.repeat(sizes, sizes)
+    small = (size >= 2) & (size <= max_bucket)
+    keys, pks = keys[small], pks[small]
+    codes = []
+    for d in range(1, max_bucket):
+        same = keys[d:] == keys[:-d]
+        if not same.any():
+            break
+        codes.append(pks[:-d][same] << 32 | pks[d:][same])
+    if not codes:
+        return np.empty((0, 2), dtype=np.int64)
+    codes = np.unique(np.concatenate(codes))
+    return np.stack([codes >> 32, codes & 0xFFFFFFFF], axis=1)
+
+
+@_timed
+@_cached
+def duplicate_clusters(min_score: float = 0.6, only_open: bool = True, max_bucket: int = 20) -> pd.DataFrame:
+    """
+    Groups of actions with near-identical problems, one row per action with a `cluster`
+    number, largest groups first. Two actions are linked when they share an LSH bucket and
+    their MinHash similarity (estimated trigram Jaccard) is >= min_score. Buckets of more
+    than `max_bucket` actions (boilerplate text) are skipped.
+    """
+    columns = ["cluster", "size", *SIMILAR_COLUMNS]
+    sig = ActionSignature.__table__
+    stmt = select(sig.c.key, sig.c.action_pk).join(Action, Action.id == sig.c.action_pk)
+    if only_open:
+        stmt = stmt.where(_is_open())
+    stmt = stmt.order_by(sig.c.key, sig.c.action_pk)
+
+    with SessionLocal() as s:
+        rows = pd.DataFrame.from_records(s.execute(stmt).all(), columns=["key", "action_pk"])
+        pairs = _bucket_pairs(rows["key"].to_numpy("int64"), rows["action_pk"].to_numpy("int64"), max_bucket)
+        if not len(pairs):
+            return pd.DataFrame(columns=columns)
+        pks = np.unique(pairs).tolist()
+        detail = select(Action.id, Action.problem, *[_column(Action, c) for c in SIMILAR_COLUMNS])
+        found = []
+        for i in range(0, len(pks), _IN_CHUNK):
+            found.extend(s.execute(detail.where(Action.id.in_(pks[i:i + _IN_CHUNK]))).all())
+
+    # Estimated Jaccard: share of equal MinHash values (indexed texts are never empty, so
+    # every action of a pair has a signature)
+    found.sort(key=lambda r: r[0])
+    _, sigs = _minhash([r[1] for r in found])
+    ids = np.array([r[0] for r in found], dtype=np.int64)
+    x, y = np.searchsorted(ids, pairs[:, 0]), np.searchsorted(ids, pairs[:, 1])
+    linked = (sigs[x] == sigs[y]).mean(axis=1) >= min_score
+    if not linked.any():
+        return pd.DataFrame(columns=columns)
+
+    parent = list(range(len(found)))
+
+    def root(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in zip(x[linked].tolist(), y[linked].tolist()):
+        parent[root(i)] = root(j)
+
+    members = np.unique(np.concatenate([x[linked], y[linked]])).tolist()
+    df = pd.DataFrame([found[i][2:] for i in members], columns=SIMILAR_COLUMNS)
+    df["pk"] = ids[members]
+    df["root"] = [root(i) for i in members]
+    df["size"] = df.groupby("root")["root"].transform("size")
+    df = df.sort_values(["size", "root", "pk"], ascending=[False, True, True], kind="stable")
+    df["cluster"] = pd.factorize(df["root"])[0] + 1
+    return df[columns].reset_index(drop=True)
+
+
+# -------------------- CRUD --------------------
+@_timed
+def create_action(payload: Dict[str, Any]) -> str:
+    """
+    Inserts the action and returns its action_id (allocated atomically when the payload has none).
+    With the write queue enabled, waits (WRITE_QUEUE_TIMEOUT_S at most) for the group commit that writes it.
+    """
+    writer = write_queue()
+    if writer is not None:
+        return _wait(writer.submit_create(payload))
+    with _write_session() as s:
+        action_id = _insert_actions(s, [payload], _next_version(s))[0]
+        s.commit()
+    _data_changed()
+    return action_id
+
+
+def _insert_actions(s, payloads: List[Dict[str, Any]], version: int) -> List[str]:
+    # Body of create_action, for one or more payloads, in the caller's write transaction
+    pks = _allocate_ids(s, len(payloads))
+    payloads = [dict(p) for p in payloads]
+    now = int(time.time())
+    events = []
+    for pk, payload in zip(pks, payloads):
+        if not payload.get("action_id"):
+            payload["action_id"] = _format_action_id(pk)
+        s.add(Action(id=pk, row_version=version, **payload))
+        status = payload.get("status") or "À faire"
+        events.append({
+            "action_pk": pk, "ts": now, "kind": "created", "status": status,
+            "dept_owner": payload.get("dept_owner") or "",
+            "blockage": (payload.get("blockage") or "") if status == "Bloqué" else "",
+        })
+    _index_signatures(s, pks, [p.get("problem") for p in payloads], replace=False)
+    _log_events(s, pd.DataFrame(events))
+    return [p["action_id"] for p in payloads]
+
+
+ACTION_COLUMNS: List[str] = [
+    "action_id", "created_at", "created_by",
+    "zone", "line", "machine",
+    "type", "m6",
+    "problem", "impact",
+    "containment", "root_cause", "countermeasure", "action_kind",
+    "dept_owner", "owner_name", "support_needed",
+    "priority", "due_date",
+    "status", "blockage", "next_step",
+    "closed_at", "proof_link", "standard_updated", "quality_validation_required",
+]
+DERIVED_COLUMNS: List[str] = ["is_late", "age_days"]
+
+# Unbounded text fields: lists carry at most a preview of them (<field>_preview, cut by
+# SQLite to PREVIEW_CHARS), the full text comes from get_action_details.
+TEXT_COLUMNS: List[str] = ["problem", "containment", "root_cause", "countermeasure", "next_step"]
+PREVIEW_COLUMNS: List[str] = [f"{c}_preview" for c in TEXT_COLUMNS]
+PREVIEW_CHARS = 80
+SUMMARY_COLUMNS: List[str] = [c for c in ACTION_COLUMNS if c not in TEXT_COLUMNS] + DERIVED_COLUMNS
+BOOL_COLUMNS = ["standard_updated", "quality_validation_required"]
+CLOSED_STATUSES = ["Fait", "Annulé"]
+
+# Columns whose domain is a list_values list (categorical mode)
+CATEGORY_LISTS: Dict[str, str] = {
+    "status": "statuses",
+    "priority": "priorities",
+    "dept_owner": "departments",
+    "type": "types",
+    "m6": "m6",
+    "action_kind": "action_kinds",
+    "blockage": "blockages",
+}
+
+# Source columns needed to compute each derived column
+_DERIVED_INPUTS: Dict[str, List[str]] = {
+    "is_late": ["status", "due_date"],
+    "age_days": ["created_at"],
+}
+
+
+def _is_open(src=Action):
+    # Closed statuses are inlined (not bound) so SQLite can match the partial "open" indexes
+    return src.status.notin_([literal_column("'" + v.replace("'", "''") + "'") for v in CLOSED_STATUSES])
+
+
+def _source(filters: Dict[str, Any]):
+    """
+    Action, or with filters["history"] an alias of Action over the hot table UNION ALL the archive.
+    """
+    if not filters.get("history"):
+        return Action
+    cols = [c.name for c in Action.__table__.columns]
+    both = union_all(
+        select(*[Action.__table__.c[c] for c in cols]),
+        select(*[ActionArchive.__table__.c[c] for c in cols]),
+    ).subquery("actions_all")
+    return aliased(Action, both)
+
+
+def _preview(col, chars: int = PREVIEW_CHARS):
+    return case(
+        (func.length(col) > chars, func.substr(col, 1, chars - 1, type_=Text) + "…"),
+        else_=col,
+    )
+
+
+def _column(src, name: str):
+    # Model column, or "<text field>_preview"
+    if name in PREVIEW_COLUMNS:
+        return _preview(getattr(src, name[:-len("_preview")])).label(name)
+    return getattr(src, name)
+
+
+def _apply_filters(stmt, filters: Dict[str, Any], src=Action):
+    if filters.get("dept_owner") and filters["dept_owner"] != "Tous":
+        stmt = stmt.where(src.dept_owner == filters["dept_owner"])
+    if filters.get("type") and filters["type"] != "Tous":
+        stmt = stmt.where(src.type == filters["type"])
+    if filters.get("status") and filters["status"] != "Tous":
+        stmt = stmt.where(src.status == filters["status"])
+    if filters.get("priority") and filters["priority"] != "Tous":
+        stmt = stmt.where(src.priority == filters["priority"])
+    if filters.get("only_open"):
+        stmt = stmt.where(_is_open(src))
+
+    # Search (text fields): full-text index when available, LIKE otherwise
+    q = (filters.get("search") or "").strip()
+    if q:
+        match = _fts_query(q) if src is Action and _search_index_available() else None
+        if match:
+            stmt = stmt.where(src.id.in_(select(_fts.c.rowid).where(_fts_match(match))))
+        else:
+            like = f"%{q}%"
+            stmt = stmt.where(or_(*[getattr(src, f).like(like) for f in SEARCH_FIELDS]))
+    return stmt
+
+
+def _board_order(src=Action) -> List[Any]:
+    # "due_date IS NULL" rather than NULLS LAST: same order, but ix_actions_board can serve it
+    return [src.priority.asc(), src.due_date.is_(None).asc(), src.due_date.asc(), src.id.desc()]
+
+
+def _projection(columns: Optional[List[str]]) -> Tuple[List[str], List[str]]:
+    """
+    Returns (wanted, fetched): the output columns and the model columns to select for them.
+    """
+    wanted = list(columns) if columns is not None else ACTION_COLUMNS + DERIVED_COLUMNS
+    known = ACTION_COLUMNS + DERIVED_COLUMNS + PREVIEW_COLUMNS
+    unknown = [c for c in wanted if c not in known]
+    if unknown:
+        raise ValueError(f"Colonnes inconnues : {', '.join(unknown)}")
+
+    fetched = [c for c in wanted if c in ACTION_COLUMNS or c in PREVIEW_COLUMNS]
+    for c in wanted:
+        for dep in _DERIVED_INPUTS.get(c, []):
+            if dep not in fetched:
+                fetched.append(dep)
+    return wanted, fetched
+
+
+def _as_categories(df: pd.DataFrame) -> None:
+    # Ordered by the list domain; values outside it ("" or a value removed from the list)
+    # are kept as extra categories after the domain, never turned into NaN. "" is always
+    # one, so frames of the same columns share their categories and concat keeps them.
+    for col, list_name in CATEGORY_LISTS.items():
+        if col in df.columns:
+            domain = list_domain(list_name)
+            extra = sorted((set(df[col].dropna().unique()) | {""}) - set(domain))
+            df[col] = pd.Categorical(df[col], categories=domain + extra, ordered=True)
+
+
+def _infer_empty_dtypes(df: pd.DataFrame) -> None:
+    # from_records infers nothing from zero rows: the dtypes it gives rows of these column types
+    types = {c.name: c.type for c in Action.__table__.columns}
+    for col in df.columns:
+        kind = types.get(col)
+        if isinstance(kind, (String, Text)):
+            df[col] = df[col].astype(str)
+        elif isinstance(kind, DateTime):
+            df[col] = df[col].astype("datetime64[us]")
+        elif isinstance(kind, Integer):
+            df[col] = df[col].astype("int64")
+
+
+def _actions_frame(rows: List[Any], fetched: List[str], wanted: List[str], categorical: bool = False) -> pd.DataFrame:
+    # No shortcut when empty: the frame goes through the same conversions and keeps its dtypes
+    df = pd.DataFrame.from_records(rows, columns=fetched)
+    if df.empty:
+        _infer_empty_dtypes(df)
+    if categorical:
+        _as_categories(df)
+
+    for c in BOOL_COLUMNS:
+        if c in df.columns:
+            df[c] = df[c].astype("boolean").fillna(False).astype(bool)
+
+    today = date.today()
+    if "is_late" in wanted:
+        due = pd.to_datetime(df["due_date"])
+        df["is_late"] = ~df["status"].isin(CLOSED_STATUSES) & due.notna() & (due < pd.Timestamp(today))
+    if "age_days" in wanted:
+        df["age_days"] = (pd.to_datetime(today) - pd.to_datetime(df["created_at"]).dt.normalize()).dt.days
+    return df[wanted]
+
+
+@_timed
+@_cached
+def list_actions(
+    filters: Dict[str, Any] | None = None,
+    columns: Optional[List[str]] = None,
+    categorical: bool = False,
+) -> pd.DataFrame:
+    """
+    Actions matching `filters`, in board order (priority, due date, newest first).
+
+    `columns` restricts the result to the given fields (model columns, `is_late`, `age_days`,
+    `<text>_preview`); only what is needed is selected from the database. Default: every column.
+    SUMMARY_COLUMNS (+ previews) is the light projection for lists. Archived actions are included only with filters["history"] = True.
+    `categorical` returns the CATEGORY_LISTS columns as ordered Categoricals (list_domain order).
+    """
+    filters = filters or {}
+    wanted, fetched = _projection(columns)
+    src = _source(filters)
+
+    stmt = select(*[_column(src, c) for c in fetched])
+    stmt = _apply_filters(stmt, filters, src)
+    stmt = stmt.order_by(*_board_order(src))
+
+    with SessionLocal() as s:
+        rows = s.execute(stmt).all()
+
+    return _actions_frame(rows, fetched, wanted, categorical)
+
+
+@_timed
+@_cached
+def count_actions(filters: Dict[str, Any] | None = None) -> int:
+    filters = filters or {}
+    src = _source(filters)
+    stmt = _apply_filters(select(func.count(src.id)), filters, src)
+    with SessionLocal() as s:
+        return int(s.execute(stmt).scalar_one() or 0)
+
+
+# Keyset cursor: (priority, due_date, id) of the last row of the previous page
+Cursor = Tuple[Optional[str], Optional[date], int]
+
+
+@dataclass
+class ActionsPage:
+    df: pd.DataFrame
+    next_cursor: Optional[Cursor]   # None on the last page
+    total: int                      # rows matching the filters, all pages
+
+
+def _after_cursor(cursor: Cursor, src=Action):
+    # Rows strictly after `cursor` in board order (priority, due_date nulls last, id desc)
+    prio, due, pk = cursor
+    if due is None:
+        same_prio = and_(src.due_date.is_(None), src.id < pk)
+    else:
+        same_prio = or_(
+            src.due_date > due,
+            src.due_date.is_(None),
+            and_(src.due_date == due, src.id < pk),
+        )
+    if prio is None:
+        return or_(src.priority.isnot(None), and_(src.priority.is_(None), same_prio))
+    return or_(src.priority > prio, and_(src.priority == prio, same_prio))
+
+
+@_timed
+@_cached
+def list_actions_page(
+    filters: Dict[str, Any] | None = None,
+    columns: Optional[List[str]] = None,
+    page_size: int = 200,
+    cursor: Optional[Cursor] = None,
+) -> ActionsPage:
+    """
+    One window of list_actions: the `page_size` rows following `cursor` (first page if None).
+    Seeks on the sort key instead of OFFSET, so every page costs the same.
+    """
+    filters = filters or {}
+    wanted, fetched = _projection(columns)
+    keys = fetched + [c for c in ("priority", "due_date") if c not in fetched]
+
+    src = _source(filters)
+
+    stmt = select(*[_column(src, c) for c in keys], src.id)
+    stmt = _apply_filters(stmt, filters, src)
+    if cursor is not None:
+        stmt = stmt.where(_after_cursor(cursor, src))
+    stmt = stmt.order_by(*_board_order(src)).limit(page_size + 1)
+
+    with SessionLocal() as s:
+        rows = s.execute(stmt).all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = (last[keys.index("priority")], last[keys.index("due_date")], last[-1])
+
+    df = _actions_frame([r[:len(fetched)] for r in rows], fetched, wanted)
+    return ActionsPage(df=df, next_cursor=next_cursor, total=count_actions(filters))
+
+
+DETAIL_COLUMNS: List[str] = ["action_id", *TEXT_COLUMNS]
+
+
+@_timed
+def get_action_details(action_ids: List[str]) -> pd.DataFrame:
+    """
+    Full text fields (DETAIL_COLUMNS) of the given actions, archived ones included, in the
+    order asked; unknown ids are left out. Only ids missing from the LRU cache are queried,
+    _IN_CHUNK per statement.
+    """
+    ids = list(dict.fromkeys(action_ids))
+    sync_data_version()
+    generation = _details_cache.generation
+    found: Dict[str, Tuple[Any, ...]] = {}
+    for aid in ids:
+        hit, row = _details_cache.get((generation, aid))
+        if hit:
+            found[aid] = row
+
+    missing = [aid for aid in ids if aid not in found]
+    if missing:
+        with SessionLocal() as s:
+            for model in (Action, ActionArchive):
+                todo = [aid for aid in missing if aid not in found]
+                for i in range(0, len(todo), _IN_CHUNK):
+                    stmt = select(*[getattr(model, c) for c in DETAIL_COLUMNS])
+                    for row in s.execute(stmt.where(model.action_id.in_(todo[i:i + _IN_CHUNK]))):
+                        found[row[0]] = tuple(row)
+                        _details_cache.put((generation, row[0]), tuple(row))
+
+    return pd.DataFrame.from_records([found[aid] for aid in ids if aid in found], columns=DETAIL_COLUMNS)
+
+
+UPDATABLE_COLUMNS: List[str] = [
+    "dept_owner", "owner_name", "support_needed", "priority", "due_date",
+    "status", "blockage", "next_step", "proof_link",
+    "standard_updated", "quality_validation_required",
+]
+UPDATE_REPORT_COLUMNS = ["action_id", "result", "changed"]
+
+# SQLite host-parameter limit is 999 on older builds
+_IN_CHUNK = 500
+
+
+def _normalize_updates(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    for k in df.columns:
+        if k == "due_date":
+            d = pd.to_datetime(df[k], errors="coerce")
+            df[k] = pd.Series(d.dt.date, index=df.index, dtype=object).where(d.notna(), None)
+        elif k in BOOL_COLUMNS:
+            df[k] = df[k].astype("boolean").fillna(False).astype(bool)
+        elif k != "action_id":
+            # Missing text stays None: a NULL in the table compares equal and is not rewritten as ""
+            df[k] = df[k].astype(object).where(df[k].notna(), None)
+    return df
+
+
+def _fetch_actions(s, action_ids: List[str], columns: List[str]) -> pd.DataFrame:
+    cols = [getattr(Action, c) for c in columns]
+    rows: List[Any] = []
+    for i in range(0, len(action_ids), _IN_CHUNK):
+        chunk = action_ids[i:i + _IN_CHUNK]
+        rows.extend(s.execute(select(*cols).where(Action.action_id.in_(chunk))).all())
+    return pd.DataFrame.from_records(rows, columns=columns)
+
+
+def _same(new: pd.Series, old: pd.Series) -> pd.Series:
+    return (new == old) | (new.isna() & old.isna())
+
+
+def _update_events(m: pd.DataFrame, changed: pd.DataFrame, status: pd.Series) -> pd.DataFrame:
+    # Status, department, or blockage reason while "Bloqué": one event per affected row
+    def new(col: str) -> pd.Series:
+        return m[col] if col in changed.columns else m[f"{col}_db"]
+
+    moved = changed["status"] if "status" in changed.columns else pd.Series(False, index=m.index)
+    dept = changed["dept_owner"] if "dept_owner" in changed.columns else pd.Series(False, index=m.index)
+    reason = (changed["blockage"] if "blockage" in changed.columns else pd.Series(False, index=m.index)) & (status == "Bloqué")
+    hit = moved | dept | reason
+    if not hit.any():
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    return pd.DataFrame({
+        "action_pk": m.loc[hit, "id_db"].astype("int64"),
+        "ts": int(time.time()),
+        "kind": np.where(dept[hit] & ~moved[hit] & ~reason[hit], "dept", "status"),
+        "status": status[hit],
+        "dept_owner": new("dept_owner")[hit],
+        "blockage": new("blockage")[hit].where(status[hit] == "Bloqué", ""),
+    })
+
+
+@_timed
+def update_actions_from_df(df_updates: pd.DataFrame) -> pd.DataFrame:
+    """
+    df_updates must include 'action_id' and fields to update.
+
+    All rows are fetched in one pass and only the fields that differ are written, with one
+    batched UPDATE per set of changed fields. Returns one row per action_id:
+    result = updated / missing / unchanged, changed = the written fields.
+    With the write queue enabled, waits (WRITE_QUEUE_TIMEOUT_S at most) for the group commit that writes them.
+    """
+    if df_updates.empty:
+        return pd.DataFrame(columns=UPDATE_REPORT_COLUMNS)
+    writer = write_queue()
+    if writer is not None:
+        return _wait(writer.submit_updates(df_updates))
+
+    with _write_session() as s:
+        report, dirty = _apply_updates(s, df_updates, _next_version(s))
+        s.commit()
+    if dirty:
+        _data_changed()
+    return report
+
+
+def _apply_updates(s, df_updates: pd.DataFrame, version: int) -> Tuple[pd.DataFrame, bool]:
+    # Body of update_actions_from_df in the caller's write transaction: (report, anything written)
+    fields = [k for k in UPDATABLE_COLUMNS if k in df_updates.columns]
+    upd = _normalize_updates(df_updates[["action_id"] + fields].drop_duplicates("action_id", keep="last"))
+    upd = upd.reset_index(drop=True)
+    ids = upd["action_id"].tolist()
+
+    db_cols = list(dict.fromkeys(["id", "action_id"] + fields + ["status", "closed_at", "dept_owner", "blockage"]))
+    current = _fetch_actions(s, ids, db_cols)
+    current = current.rename(columns={c: f"{c}_db" for c in db_cols if c != "action_id"})
+    m = upd.merge(current, on="action_id", how="left")
+    found = m["id_db"].notna()
+
+    changed = pd.DataFrame({k: found & ~_same(m[k], m[f"{k}_db"]) for k in fields}, index=m.index)
+
+    # Auto close date when "Fait", cleared otherwise
+    status = m["status"] if "status" in fields else m["status_db"]
+    closed_old = m["closed_at_db"]
+    closed_new = closed_old.where(closed_old.notna(), date.today()).where(status == "Fait", None)
+    m["closed_at"] = closed_new
+    changed["closed_at"] = found & ~_same(closed_new, closed_old)
+
+    dirty = changed.any(axis=1)
+    if dirty.any():
+        t = Action.__table__
+        names = list(changed.columns)
+        # One bit per field: rows with the same set of changed fields share one executemany
+        signature = changed[dirty].to_numpy().astype("int64") @ (1 << np.arange(len(names), dtype="int64"))
+        for sig, idx in pd.Series(signature, index=changed.index[dirty]).groupby(signature).groups.items():
+            cols = [c for b, c in enumerate(names) if sig >> b & 1]
+            values: Dict[str, Any] = {c: bindparam(f"v_{c}") for c in cols}
+            values["row_version"] = version
+            stmt = update(t).where(t.c.id == bindparam("pk")).values(values)
+            part = m.loc[idx, ["id_db", *cols]]
+            part.columns = ["pk", *[f"v_{c}" for c in cols]]
+            part = part.astype({"pk": "int64"}).astype(object).where(part.notna(), None)
+            s.execute(stmt, part.to_dict("records"))
+        _log_events(s, _update_events(m, changed, status))
+
+    changed_names = changed.dot(pd.Index(changed.columns) + ", ").str.rstrip(", ")
+    result = pd.Series("unchanged", index=m.index, dtype=object)
+    result[dirty] = "updated"
+    result[~found] = "missing"
+    report = pd.DataFrame({"action_id": m["action_id"], "result": result, "changed": changed_names})
+    return report, bool(dirty.any())
+
+
+# -------------------- WRITE QUEUE (GROUP COMMIT) --------------------
+# Optional (QR1_WRITE_QUEUE=1 or enable_write_queue()): creations and updates from every
+# session go to one writer thread, which writes all the pending ones in one transaction.
+# A burst at shift change then costs a few commits instead of one each, and the sessions
+# no longer queue on the SQLite write lock. Callers wait on a Future per request.
+WRITE_QUEUE_ENABLED = os.environ.get("QR1_WRITE_QUEUE", "0") == "1"
+WRITE_QUEUE_LINGER_S = 0.002    # how long the writer waits for more requests after the first
+WRITE_QUEUE_MAX_BATCH = 500
+WRITE_QUEUE_TIMEOUT_S = float(os.environ.get("QR1_WRITE_QUEUE_TIMEOUT_S", "30"))
+
+
+@dataclass
+class _WriteRequest:
+    kind: str          # create / update
+    data: Any          # payload dict / updates frame
+    future: Future
+
+
+def _failed(exc: Exception) -> Future:
+    future: Future = Future()
+    future.set_exception(exc)
+    return future
+
+
+def _wait(future: Future) -> Any:
+    # Bounded: a stalled writer must not hang the session that saves. The request is not
+    # withdrawn (the writer may be writing it), so the message does not claim it failed.
+    try:
+        return future.result(timeout=WRITE_QUEUE_TIMEOUT_S)
+    except FutureTimeout:
+        raise TimeoutError(f"Écriture non confirmée après {WRITE_QUEUE_TIMEOUT_S:g} s (file d’écriture bloquée).") from None
+
+
+class WriteQueue:
+    def __init__(self, linger: float = WRITE_QUEUE_LINGER_S, max_batch: int = WRITE_QUEUE_MAX_BATCH) -> None:
+        self.linger = linger
+        self.max_batch = max_batch
+        self.requests = 0      # written so far, and in how many transactions
+        self.batches = 0
+        self._pending: SimpleQueue = SimpleQueue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="qr1-writer", daemon=True)
+        self._thread.start()
+
+    def submit_create(self, payload: Dict[str, Any]) -> Future:
+        """
+        Future of the new action_id. Same inputs as the direct create_action: the form rules
+        are the page's, a payload the insert rejects fails alone (its batch is replayed).
+        """
+        return self._submit("create", dict(payload))
+
+    def submit_updates(self, df_updates: pd.DataFrame) -> Future:
+        """
+        Future of the update_actions_from_df report.
+        """
+        if df_updates.empty:
+            future: Future = Future()
+            future.set_result(pd.DataFrame(columns=UPDATE_REPORT_COLUMNS))
+            return future
+        return self._submit("update", df_updates.copy())
+
+    @property
+    def alive(self) -> bool:
+        return self._thread.is_alive() and not self._closed
+
+    def close(self) -> None:
+        # Writes what is already queued, then stops the thread
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._pending.put(None)
+        self._thread.join()
+
+    def _submit(self, kind: str, data: Any) -> Future:
+        request = _WriteRequest(kind, data, Future())
+        with self._lock:
+            if self._closed:
+                return _failed(RuntimeError("File d’écriture arrêtée."))
+            self._pending.put(request)
+        return request.future
+
+    def _next_batch(self) -> Optional[List[_WriteRequest]]:
+        first = self._pending.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.max_batch:
+            try:
+                request = self._pending.get(timeout=max(0.0, deadline - time.monotonic()))
+            except Empty:
+                break
+            if request is None:
+                self._pending.put(None)   # stop after this batch
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self._write(batch)
+            except Exception as exc:
+                if len(batch) == 1:
+                    batch[0].future.set_exception(exc)
+                    continue
+                # Rolled back: one transaction per request, so only the faulty one fails
+                for request in batch:
+                    try:
+                        self._write([request])
+                    except Exception as exc:
+                        request.future.set_exception(exc)
+
+    def _write(self, batch: List[_WriteRequest]) -> None:
+        creates = [r for r in batch if r.kind == "create"]
+        results: List[Tuple[_WriteRequest, Any]] = []
+        dirty = bool(creates)
+        with _write_session() as s:
+            version = _next_version(s)
+            if creates:
+                results.extend(zip(creates, _insert_actions(s, [r.data for r in creates], version)))
+            for group in _update_groups([r for r in batch if r.kind == "update"]):
+                # One pass for the group, then each request gets its own rows of the report
+                report, wrote = _apply_updates(s, pd.concat([r.data for r in group], ignore_index=True), version)
+                dirty = dirty or wrote
+                start = 0
+                for request in group:
+                    n = len(request.data["action_id"].drop_duplicates())
+                    results.append((request, report.iloc[start:start + n].reset_index(drop=True)))
+                    start += n
+            s.commit()
+        if dirty:
+            _data_changed()
+        self.requests += len(batch)
+        self.batches += 1
+        for request, value in results:
+            request.future.set_result(value)
+
+
+def _update_groups(updates: List[_WriteRequest]) -> Iterator[List[_WriteRequest]]:
+    # Consecutive update requests are merged while they have the same columns and no action
+    # in common: the result is the same as applying them one after the other
+    group: List[_WriteRequest] = []
+    seen: set = set()
+    for request in updates:
+        ids = set(request.data["action_id"])
+        if group and (set(request.data.columns) != set(group[0].data.columns) or ids & seen):
+            yield group
+            group, seen = [], set()
+        group.append(request)
+        seen |= ids
+    if group:
+        yield group
+
+
+_write_queue: Optional[WriteQueue] = None
+_write_queue_lock = threading.Lock()
+
+
+def write_queue() -> Optional[WriteQueue]:
+    """
+    The process's write queue (started on first use when QR1_WRITE_QUEUE=1), or None.
+    None as well when its thread has stopped: callers then write directly.
+    """
+    if _write_queue is None and WRITE_QUEUE_ENABLED:
+        return enable_write_queue()
+    if _write_queue is not None and not _write_queue.alive:
+        return None
+    return _write_queue
+
+
+def enable_write_queue(linger: float = WRITE_QUEUE_LINGER_S, max_batch: int = WRITE_QUEUE_MAX_BATCH) -> WriteQueue:
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            _write_queue = WriteQueue(linger, max_batch)
+        return _write_queue
+
+
+def disable_write_queue() -> None:
+    """
+    Writes what is pending, then back to one transaction per call.
+    """
+    global _write_queue, WRITE_QUEUE_ENABLED
+    with _write_queue_lock:
+        writer, _write_queue = _write_queue, None
+        WRITE_QUEUE_ENABLED = False
+    if writer is not None:
+        writer.close()
+
+
+# -------------------- INCREMENTAL REFRESH --------------------
+# Every write stamps the rows it touches with a new row_version (one per transaction).
+# A session keeps the version of its last load and asks only for what changed since.
+@dataclass
+class ChangeSet:
+    rows: pd.DataFrame      # inserted / updated actions that match the filters
+    removed: List[str]      # action_ids to drop: changed and no longer matching, or archived
+    version: int            # pass back as `since` on the next call
+
+
+@_timed
+@_cached
+def changes_since(
+    since: Optional[int],
+    filters: Dict[str, Any] | None = None,
+    columns: Optional[List[str]] = None,
+) -> ChangeSet:
+    """
+    Actions written after row_version `since`, with the filters and columns of list_actions
+    (action_id is always included). `since=None` is a full load. Cost follows the number of
+    changed rows, through the row_version index.
+    """
+    filters = filters or {}
+    if columns is not None and "action_id" not in columns:
+        columns = ["action_id", *columns]
+    wanted, fetched = _projection(columns)
+    src = _source(filters)
+
+    with SessionLocal() as s:
+        # Same read transaction for every statement: the version matches the rows returned
+        version = _last_version(s)
+        window = src.row_version <= version
+        if since is not None:
+            window = and_(src.row_version > since, window)
+
+        stmt = select(*[_column(src, c) for c in fetched]).where(window)
+        stmt = _apply_filters(stmt, filters, src).order_by(*_board_order(src))
+        df = _actions_frame(s.execute(stmt).all(), fetched, wanted)
+
+        removed: List[str] = []
+        if since is not None:
+            changed = set(s.execute(select(src.action_id).where(window)).scalars())
+            if not filters.get("history"):
+                changed.update(s.execute(select(ActionArchive.action_id).where(
+                    ActionArchive.row_version > since, ActionArchive.row_version <= version
+                )).scalars())
+            removed = sorted(changed - set(df["action_id"]))
+
+    return ChangeSet(rows=df, removed=removed, version=int(version))
+
+
+def merge_changes(df: pd.DataFrame, changes: ChangeSet) -> pd.DataFrame:
+    """
+    Applies a ChangeSet to a frame loaded earlier (same columns), matching rows by action_id.
+    Updated rows keep their position (only the cells that differ are written), new rows are
+    appended, removed rows dropped.
+    """
+    rows = changes.rows
+    if rows.empty and not changes.removed:
+        return df
+
+    out = df.copy()
+    # isin() with the small side as argument: the board can hold 100k+ ids
+    hit = np.flatnonzero(out["action_id"].isin(rows["action_id"]).to_numpy())
+    found = out["action_id"].iloc[hit]
+    if len(hit):
+        new = rows.set_index("action_id").loc[found].reset_index()[out.columns]
+        old = out.iloc[hit].reset_index(drop=True)
+        diff = ~((new == old) | (new.isna() & old.isna()))
+        for j in np.flatnonzero(diff.any().to_numpy()):
+            cells = diff.iloc[:, j].to_numpy()
+            out.iloc[hit[cells], j] = new.iloc[:, j].to_numpy()[cells]
+
+    added = rows[~rows["action_id"].isin(found)]
+    if changes.removed:
+        out = out[~out["action_id"].isin(changes.removed)]
+    if not added.empty:
+        out = pd.concat([out, added[out.columns]])
+    return out.reset_index(drop=True)
+
+
+# -------------------- DASHBOARD QUERIES --------------------
+def _kpi_columns(today: date) -> List[Any]:
+    last7 = today - timedelta(days=7)
+    is_open = _is_open()
+    return [
+        func.sum(case((is_open, 1), else_=0)),
+        func.sum(case((and_(is_open, Action.due_date.isnot(None), Action.due_date < today), 1), else_=0)),
+        func.sum(case((Action.status == "Bloqué", 1), else_=0)),
+        func.sum(case((and_(Action.status == "Fait", Action.closed_at.isnot(None), Action.closed_at >= last7), 1), else_=0)),
+    ]
+
+
+@_timed
+@_cached
+def kpis() -> Dict[str, Any]:
+    with SessionLocal() as s:
+        total_open, total_late, total_blocked, closed_7d = s.execute(
+            select(*_kpi_columns(date.today()))
+        ).one()
+
+    return {
+        "open": int(total_open or 0),
+        "late": int(total_late or 0),
+        "blocked": int(total_blocked or 0),
+        "closed_7d": int(closed_7d or 0),
+    }
+
+
+TOP_COLUMNS = ["action_id", "priority", "type", "problem", "dept_owner", "owner_name", "due_date", "status", "next_step"]
+BLOCKED_COLUMNS = ["action_id", "priority", "type", "problem", "blockage", "dept_owner", "owner_name", "support_needed", "due_date", "next_step"]
+CLOSED_COLUMNS = ["action_id", "type", "problem", "dept_owner", "owner_name", "closed_at", "standard_updated", "proof_link"]
+
+
+@dataclass
+class DashboardSnapshot:
+    kpis: Dict[str, Any]
+    top: pd.DataFrame        # open P1/P2 of the filter, by priority then due date
+    blocked: pd.DataFrame    # "Bloqué" of the filter, by priority then due date
+    pareto: pd.DataFrame     # open actions of the filter per type (type, count)
+    closed: pd.DataFrame     # last closures of the 7 days, all departments/types, newest first
+    matching: int            # open actions of the filter (+ recent closures if not only_open)
+
+
+def _first_rows(filters: Dict[str, Any] | None, columns: List[str], where: Callable, order: Callable,
+                limit: int) -> pd.DataFrame:
+    # list_actions semantics, restricted by where(src), sorted and cut by SQLite
+    filters = filters or {}
+    wanted, fetched = _projection(columns)
+    src = _source(filters)
+    stmt = _apply_filters(select(*[_column(src, c) for c in fetched]), filters, src)
+    stmt = stmt.where(*where(src)).order_by(*order(src)).limit(limit)
+    with SessionLocal() as s:
+        rows = s.execute(stmt).all()
+    return _actions_frame(rows, fetched, wanted)
+
+
+@_timed
+@_cached
+def top_actions(
+    filters: Dict[str, Any] | None = None,
+    columns: Optional[List[str]] = None,
+    limit: int = 10,
+    priorities: Tuple[str, ...] = ("P1", "P2"),
+) -> pd.DataFrame:
+    """
+    The first `limit` open actions of `filters` with a priority in `priorities`, board order.
+    """
+    return _first_rows(
+        filters, columns or TOP_COLUMNS,
+        lambda src: [_is_open(src), src.priority.in_(priorities)], _board_order, limit,
+    )
+
+
+@_timed
+@_cached
+def blocked_actions(
+    filters: Dict[str, Any] | None = None,
+    columns: Optional[List[str]] = None,
+    limit: int = 10,
+) -> pd.DataFrame:
+    """
+    The first `limit` "Bloqué" actions of `filters`, board order.
+    """
+    return _first_rows(filters, columns or BLOCKED_COLUMNS, lambda src: [src.status == "Bloqué"], _board_order, limit)
+
+
+def _closed_since(src, since: date):
+    return and_(src.status == "Fait", src.closed_at.isnot(None), src.closed_at >= since)
+
+
+@_timed
+@_cached
+def recent_closures(
+    filters: Dict[str, Any] | None = None,
+    columns: Optional[List[str]] = None,
+    days: int = 7,
+    limit: int = 10,
+) -> pd.DataFrame:
+    """
+    The last `limit` actions of `filters` closed ("Fait") in the last `days` days, newest first.
+    """
+    since = date.today() - timedelta(days=days)
+    return _first_rows(
+        filters, columns or CLOSED_COLUMNS,
+        lambda src: [_closed_since(src, since)], lambda src: [src.closed_at.desc(), src.id.desc()], limit,
+    )
+
+
+@_timed
+@_cached
+def type_pareto(filters: Dict[str, Any] | None = None) -> pd.DataFrame:
+    """
+    Open actions of `filters` per type (type, count), largest first.
+    """
+    filters = filters or {}
+    src = _source(filters)
+    n = func.count(src.id)
+    stmt = _apply_filters(select(src.type, n), filters, src).where(_is_open(src))
+    stmt = stmt.group_by(src.type).order_by(n.desc(), src.type)
+    with SessionLocal() as s:
+        rows = s.execute(stmt).all()
+    return pd.DataFrame.from_records(rows, columns=["type", "count"])
+
+
+@_timed
+@_cached
+def dashboard_snapshot(
+    dept_owner: str = "Tous",
+    type: str = "Tous",
+    only_open: bool = True,
+    limit: int = 10,
+) -> DashboardSnapshot:
+    """
+    Everything the QR1 dashboard shows. Each section is its own query, sorted, cut or grouped
+    by SQLite: at most `limit` rows or one count per type leave the database, whatever the
+    table size. KPIs and closures are global, the other sections follow the dept/type filter.
+    """
+    filters = {"dept_owner": dept_owner, "type": type}
+    last7 = date.today() - timedelta(days=7)
+
+    # Long texts are cut by SQLite: the tables only show the start of problem / next step
+    def previewed(fn, columns: List[str], **kwargs) -> pd.DataFrame:
+        df = fn(columns=[f"{c}_preview" if c in TEXT_COLUMNS else c for c in columns], **kwargs)
+        return df.set_axis(columns, axis=1)
+
+    counts = _apply_filters(select(
+        func.sum(case((_is_open(), 1), else_=0)),
+        func.sum(case((_closed_since(Action, last7), 1), else_=0)),
+    ), filters)
+    with SessionLocal() as s:
+        open_n, closed_n = s.execute(counts).one()
+
+    return DashboardSnapshot(
+        kpis=kpis(),
+        top=previewed(top_actions, TOP_COLUMNS, filters=filters, limit=limit),
+        blocked=previewed(blocked_actions, BLOCKED_COLUMNS, filters=filters, limit=limit),
+        pareto=type_pareto(filters),
+        closed=previewed(recent_closures, CLOSED_COLUMNS, limit=limit),
+        matching=int(open_n or 0) + (0 if only_open else int(closed_n or 0)),
+    )
+
+
+# -------------------- SITES (CONSOLIDATED BOARD) --------------------
+# One database per plant. The consolidated views run the usual query functions on every site
+# at once (thread pool), each with its own deadline: a slow or broken file only drops its
+# own site from the result, reported in `failed`.
+SITE_TIMEOUT_S = float(os.environ.get("QR1_SITE_TIMEOUT_S", "5"))
+SITE_COLUMN = "site"
+
+
+def _parse_sites(spec: str) -> Dict[str, str]:
+    # "Lyon=sqlite:///lyon.db;Metz=sqlite:///metz.db"
+    sites: Dict[str, str] = {}
+    for part in spec.split(";"):
+        name, sep, url = part.partition("=")
+        if sep and name.strip() and url.strip():
+            sites[name.strip()] = url.strip()
+    return sites
+
+
+SITES: Dict[str, str] = _parse_sites(os.environ.get("QR1_SITES", ""))
+_site_engines: Dict[str, Engine] = {}
+_site_pool: Optional[ThreadPoolExecutor] = None
+_site_lock = threading.Lock()
+# Deadline (time.monotonic) of the site query running on this thread
+_site_deadline: ContextVar[Optional[float]] = ContextVar("qr1_site_deadline", default=None)
+
+
+def configure_sites(sites: Dict[str, str]) -> None:
+    """
+    Site name -> database URL of the plants the consolidated views read.
+    """
+    global SITES, _site_pool
+    with _site_lock:
+        for eng in _site_engines.values():
+            eng.dispose()
+        _site_engines.clear()
+        _site_search_index.clear()
+        if _site_pool is not None:
+            _site_pool.shutdown(wait=False, cancel_futures=True)
+            _site_pool = None
+        SITES = dict(sites)
+
+
+def _past_deadline() -> int:
+    # SQLite progress handler: a non-zero return interrupts the running statement
+    deadline = _site_deadline.get()
+    return int(deadline is not None and time.monotonic() > deadline)
+
+
+def _site_engine(site: str) -> Engine:
+    with _site_lock:
+        if site not in _site_engines:
+            eng = create_db_engine(SITES[site])
+
+            @event.listens_for(eng, "connect")
+            def _on_connect(dbapi_conn, _record):
+                dbapi_conn.set_progress_handler(_past_deadline, 10000)
+
+            _site_engines[site] = eng
+        return _site_engines[site]
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _site_pool
+    with _site_lock:
+        if _site_pool is None:
+            _site_pool = ThreadPoolExecutor(max_workers=min(32, 2 * max(1, len(SITES))), thread_name_prefix="qr1-site")
+        return _site_pool
+
+
+def _run_on_site(site: str, deadline: float, fn: Callable, args: Tuple, kwargs: Dict[str, Any]) -> Any:
+    bind = _site_bind.set((site, _site_engine(site)))
+    limit = _site_deadline.set(deadline)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _site_deadline.reset(limit)
+        _site_bind.reset(bind)
+
+
+@dataclass
+class SitesResult:
+    value: Any                 # merged result of the sites that answered
+    sites: List[str]           # sites included, in SITES order
+    failed: Dict[str, str]     # site -> "timeout" or the error message
+
+
+def on_sites(
+    fn: Callable,
+    *args: Any,
+    sites: Optional[List[str]] = None,
+    timeout: Optional[float] = None,
+    **kwargs: Any,
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    fn(*args, **kwargs) on each site concurrently: ({site: result}, {site: error}).
+    A site still running after `timeout` seconds (default SITE_TIMEOUT_S) is interrupted.
+    """
+    names = list(SITES) if sites is None else [s for s in sites if s in SITES]
+    deadline = time.monotonic() + (SITE_TIMEOUT_S if timeout is None else timeout)
+    futures = {site: _pool().submit(_run_on_site, site, deadline, fn, args, kwargs) for site in names}
+
+    results: Dict[str, Any] = {}
+    failed: Dict[str, str] = {}
+    for site, future in futures.items():
+        try:
+            results[site] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            future.cancel()
+            failed[site] = "timeout"
+        except DBAPIError as e:
+            failed[site] = "timeout" if "interrupted" in str(e.orig) else str(e.orig)
+        except Exception as e:
+            failed[site] = str(e) or type(e).__name__
+    return results, failed
+
+
+def _with_site(results: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    frames = [df.assign(**{SITE_COLUMN: site}) for site, df in results.items() if not df.empty]
+    if not frames:
+        return pd.DataFrame(columns=[SITE_COLUMN])
+    df = pd.concat(frames, ignore_index=True)
+    return df[[SITE_COLUMN] + [c for c in df.columns if c != SITE_COLUMN]]
+
+
+def _merge_board(results: Dict[str, pd.DataFrame], limit: Optional[int] = None) -> pd.DataFrame:
+    # Board order across sites (priority, due date, no date last); each site is already sorted
+    df = _with_site(results)
+    if {"priority", "due_date"} <= set(df.columns):
+        order = pd.DataFrame({"p": df["priority"], "nodue": df["due_date"].isna(), "due": pd.to_datetime(df["due_date"])})
+        df = df.loc[order.sort_values(["p", "nodue", "due"], kind="stable").index]
+    return (df if limit is None else df.head(limit)).reset_index(drop=True)
+
+
+def _sum_pareto(results: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    frames = [df for df in results.values() if not df.empty]
+    if not frames:
+        return pd.DataFrame(columns=["type", "count"])
+    out = pd.concat(frames).groupby("type", as_index=False)["count"].sum()
+    return out.sort_values(["count", "type"], ascending=[False, True], ignore_index=True)
+
+
+def _sum_kpis(results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    total = {"open": 0, "late": 0, "blocked": 0, "closed_7d": 0}
+    for k in results.values():
+        for name in total:
+            total[name] += int(k.get(name, 0))
+    return total
+
+
+@_timed
+def sites_list_actions(
+    filters: Dict[str, Any] | None = None,
+    columns: Optional[List[str]] = None,
+    sites: Optional[List[str]] = None,
+    timeout: Optional[float] = None,
+) -> SitesResult:
+    """
+    list_actions of every site, with a `site` column, merged in board order.
+    """
+    results, failed = on_sites(list_actions, filters, columns, sites=sites, timeout=timeout)
+    return SitesResult(_merge_board(results), list(results), failed)
+
+
+@_timed
+def sites_kpis(sites: Optional[List[str]] = None, timeout: Optional[float] = None) -> SitesResult:
+    """
+    kpis() summed over the sites.
+    """
+    results, failed = on_sites(kpis, sites=sites, timeout=timeout)
+    return SitesResult(_sum_kpis(results), list(results), failed)
+
+
+@_timed
+def sites_type_pareto(
+    filters: Dict[str, Any] | None = None,
+    sites: Optional[List[str]] = None,
+    timeout: Optional[float] = None,
+) -> SitesResult:
+    """
+    type_pareto summed over the sites.
+    """
+    results, failed = on_sites(type_pareto, filters, sites=sites, timeout=timeout)
+    return SitesResult(_sum_pareto(results), list(results), failed)
+
+
+@_timed
+def sites_dashboard_snapshot(
+    dept_owner: str = "Tous",
+    type: str = "Tous",
+    only_open: bool = True,
+    limit: int = 10,
+    sites: Optional[List[str]] = None,
+    timeout: Optional[float] = None,
+) -> SitesResult:
+    """
+    Consolidated dashboard_snapshot: one snapshot per site (each at most `limit` rows per
+    section), counts summed, sections merged and cut again to `limit`, with a `site` column.
+    """
+    results, failed = on_sites(dashboard_snapshot, dept_owner, type, only_open, limit, sites=sites, timeout=timeout)
+    closed = _with_site({site: snap.closed for site, snap in results.items()})
+    if not closed.empty:
+        closed = closed.sort_values("closed_at", ascending=False, kind="stable").head(limit).reset_index(drop=True)
+    snapshot = DashboardSnapshot(
+        kpis=_sum_kpis({site: snap.kpis for site, snap in results.items()}),
+        top=_merge_board({site: snap.top for site, snap in results.items()}, limit),
+        blocked=_merge_board({site: snap.blocked for site, snap in results.items()}, limit),
+        pareto=_sum_pareto({site: snap.pareto for site, snap in results.items()}),
+        closed=closed,
+        matching=sum(snap.matching for snap in results.values()),
+    )
+    return SitesResult(snapshot, list(results), failed)
+
+
+# -------------------- EXPORT --------------------
+# Built only when asked for, streamed from the database in chunks.
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    "xlsx": ("QR1_Actions.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("QR1_Actions.csv", "text/csv"),
+    "parquet": ("QR1_Actions.parquet", "application/vnd.apache.parquet"),
+}
+EXPORT_CHUNK_SIZE = 5000
+
+_last_export: Tuple[Any, bytes] = (None, b"")
+_export_lock = threading.Lock()
+
+
+def iter_actions_chunks(
+    filters: Dict[str, Any] | None = None,
+    columns: Optional[List[str]] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[pd.DataFrame]:
+    """
+    Same rows and columns as list_actions, yielded `chunk_size` rows at a time; one empty
+    frame when nothing matches (exports still get their header / schema).
+    """
+    filters = filters or {}
+    wanted, fetched = _projection(columns)
+    src = _source(filters)
+    stmt = select(*[_column(src, c) for c in fetched])
+    stmt = _apply_filters(stmt, filters, src).order_by(*_board_order(src))
+
+    with SessionLocal() as s:
+        result = s.execute(stmt, execution_options={"yield_per": chunk_size})
+        empty = True
+        for part in result.partitions():
+            empty = False
+            yield _actions_frame(part, fetched, wanted)
+        if empty:
+            yield _actions_frame([], fetched, wanted)
+
+
+def _export_xlsx(chunks: Iterator[pd.DataFrame], out: io.BytesIO) -> None:
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Actions")
+    header = False
+    for chunk in chunks:
+        if not header:
+            ws.append(list(chunk.columns))
+            header = True
+        cells = chunk.astype(object).where(chunk.notna(), None)
+        for row in cells.itertuples(index=False, name=None):
+            ws.append(row)
+    wb.save(out)
+
+
+def _export_csv(chunks: Iterator[pd.DataFrame], out: io.BytesIO) -> None:
+    text = io.TextIOWrapper(out, encoding="utf-8-sig", newline="")
+    first = True
+    for chunk in chunks:
+        chunk.to_csv(text, index=False, header=first)
+        first = False
+    text.flush()
+    text.detach()
+
+
+def _export_parquet(chunks: Iterator[pd.DataFrame], out: io.BytesIO) -> None:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("L’export Parquet nécessite pyarrow (pip install pyarrow).") from e
+
+    # Explicit schema: a chunk where a column is all empty must not change its type
+    def arrow_type(col: str):
+        if col in ("due_date", "closed_at"):
+            return pa.date32()
+        if col == "created_at":
+            return pa.timestamp("us")
+        if col in BOOL_COLUMNS or col == "is_late":
+            return pa.bool_()
+        if col == "age_days":
+            return pa.int64()
+        return pa.string()
+
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                schema = pa.schema([(c, arrow_type(c)) for c in chunk.columns])
+                writer = pq.ParquetWriter(out, schema)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+_EXPORTERS = {"xlsx": _export_xlsx, "csv": _export_csv, "parquet": _export_parquet}
+
+
+@_timed
+def export_actions(
+    fmt: str = "xlsx",
+    filters: Dict[str, Any] | None = None,
+    columns: Optional[List[str]] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> bytes:
+    """
+    File content of the export (see EXPORT_FORMATS for the name and MIME type).
+    The last export is kept: asking again while the data is unchanged costs nothing.
+    """
+    global _last_export
+    if fmt not in _EXPORTERS:
+        raise ValueError(f"Format d’export inconnu : {fmt}")
+
+    key = (fmt, _freeze(filters or {}), _freeze(columns), sync_data_version(), date.today())
+    with _export_lock:
+        if _last_export[0] == key:
+            return _last_export[1]
+
+    out = io.BytesIO()
+    _EXPORTERS[fmt](iter_actions_chunks(filters, columns, chunk_size), out)
+    content = out.getvalue()
+
+    with _export_lock:
+        _last_export = (key, content)
+    return content
+
+
+# -------------------- BULK IMPORT --------------------
+# CSV / XLSX boards from the old spreadsheets: read in chunks, columns mapped onto Action,
+# Lean rules checked per column, valid rows inserted one transaction per chunk.
+IMPORT_CHUNK_SIZE = 5000
+IMPORT_COLUMNS = [c for c in ACTION_COLUMNS if c != "action_id"]
+
+# Header (any case/accents/punctuation) -> model field; model field names are accepted too
+IMPORT_ALIASES: Dict[str, str] = {
+    "cree par": "created_by", "createur": "created_by", "cree le": "created_at", "date creation": "created_at",
+    "zone": "zone", "ligne": "line", "poste": "machine", "machine": "machine", "poste machine": "machine",
+    "type": "type", "6m": "m6", "probleme": "problem", "impact": "impact",
+    "containment": "containment", "containment immediat": "containment",
+    "cause racine": "root_cause", "cause": "root_cause",
+    "action": "countermeasure", "contre mesure": "countermeasure", "action contre mesure": "countermeasure",
+    "type d action": "action_kind",
+    "departement": "dept_owner", "departement responsable": "dept_owner", "service": "dept_owner",
+    "responsable": "owner_name", "pilote": "owner_name", "support requis": "support_needed",
+    "priorite": "priority", "echeance": "due_date", "date echeance": "due_date",
+    "statut": "status", "blocage": "blockage", "prochaine etape": "next_step",
+    "date cloture": "closed_at", "cloture le": "closed_at",
+    "preuve": "proof_link", "preuve lien": "proof_link", "lien preuve": "proof_link",
+    "standard mis a jour": "standard_updated", "validation qualite": "quality_validation_required",
+}
+_TRUE_WORDS = ["1", "true", "vrai", "oui", "o", "yes", "y", "x"]
+
+
+def _norm_header(h: Any) -> str:
+    text = unicodedata.normalize("NFKD", str(h)).encode("ascii", "ignore").decode().lower()
+    text = re.sub(r"\(.*?\)|\*", " ", text)            # "Échéance *", "Preuve (lien)"
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def map_import_columns(headers: List[Any]) -> Dict[Any, str]:
+    """
+    Source header -> Action field, for the headers that can be mapped (first match wins).
+    """
+    known = {_norm_header(c): c for c in IMPORT_COLUMNS}
+    known.update(IMPORT_ALIASES)
+    mapping: Dict[Any, str] = {}
+    for h in headers:
+        field = known.get(_norm_header(h))
+        if field and field not in mapping.values():
+            mapping[h] = field
+    return mapping
+
+
+# Excel saves "CSV UTF-8", or a ";" separated CSV in the Windows code page (French Excel)
+CSV_ENCODINGS = ("utf-8-sig", "cp1252")
+
+
+@contextmanager
+def _binary(source: Any) -> Iterator[Any]:
+    # File objects are rewound and left open; paths are opened (and closed) here
+    if hasattr(source, "read"):
+        source.seek(0)
+        yield source
+    else:
+        with open(source, "rb") as f:
+            yield f
+
+
+def _check_decodes(source: Any, encoding: str) -> None:
+    decoder = codecs.getincrementaldecoder(encoding)()
+    with _binary(source) as f:
+        for block in iter(functools.partial(f.read, 1 << 20), b""):
+            decoder.decode(block)
+        decoder.decode(b"", final=True)
+
+
+def _csv_encoding(source: Any) -> str:
+    # The whole file is checked before the first chunk is imported: a byte that does not
+    # decode halfway through must not leave half an import behind.
+    for encoding in CSV_ENCODINGS[:-1]:
+        try:
+            _check_decodes(source, encoding)
+            return encoding
+        except UnicodeDecodeError:
+            pass
+    _check_decodes(source, CSV_ENCODINGS[-1])  # raises UnicodeDecodeError if nothing fits
+    return CSV_ENCODINGS[-1]
+
+
+def _iter_csv(source: Any, chunk_size: int) -> Iterator[pd.DataFrame]:
+    if hasattr(source, "read") and isinstance(source.read(0), str):
+        encoding = None  # text stream, already decoded
+        source.seek(0)
+        head = source.readline()
+    else:
+        encoding = _csv_encoding(source)
+        with _binary(source) as f:
+            head = f.readline().decode(encoding)
+    # French Excel writes ";" separated CSV: sniff the header line
+    sep = ";" if head.count(";") > head.count(",") else ","
+    if hasattr(source, "seek"):
+        source.seek(0)
+    yield from pd.read_csv(
+        source, sep=sep, chunksize=chunk_size, dtype=str, keep_default_na=False, encoding=encoding
+    )
+
+
+def _iter_xlsx(source: Any, chunk_size: int) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [h if h is not None else f"col{i}" for i, h in enumerate(header)]
+        batch: List[Any] = []
+        for r in rows:
+            if all(v is None or str(v).strip() == "" for v in r):
+                continue
+            batch.append(r)
+            if len(batch) >= chunk_size:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        wb.close()
+
+
+def _import_dates(values: pd.Series) -> pd.Series:
+    # One column may mix formats (old sheets edited by hand): ISO (and Excel date cells)
+    # first, then the French day-first forms. A single to_datetime call would infer one
+    # format from the first value and turn the other rows into NaT.
+    d = pd.to_datetime(values, errors="coerce", format="ISO8601")
+    for fmt in ("%d/%m/%Y", "mixed"):
+        todo = d.isna() & values.notna()
+        if not todo.any():
+            break
+        d = d.where(~todo, pd.to_datetime(values.where(todo), errors="coerce", format=fmt, dayfirst=True))
+    return d
+
+
+def _prepare_import_chunk(raw: pd.DataFrame, mapping: Dict[Any, str]) -> pd.DataFrame:
+    df = raw[list(mapping)].rename(columns=mapping)
+    n = len(df)
+    out = pd.DataFrame(index=df.index)
+    for c in IMPORT_COLUMNS:
+        if c in ("due_date", "closed_at"):
+            d = _import_dates(df[c]) if c in df else pd.Series(pd.NaT, index=df.index)
+            out[c] = pd.Series(d.dt.date, index=df.index, dtype=object).where(d.notna(), None)
+        elif c == "created_at":
+            d = _import_dates(df[c]) if c in df else pd.Series(pd.NaT, index=df.index)
+            out[c] = pd.Series(np.asarray(d.dt.to_pydatetime(), dtype=object), index=df.index).where(d.notna(), datetime.utcnow())
+        elif c in BOOL_COLUMNS:
+            v = df[c].astype(str).str.strip().str.lower() if c in df else pd.Series("", index=df.index)
+            out[c] = v.isin(_TRUE_WORDS)
+        else:
+            v = df[c] if c in df else pd.Series([""] * n, index=df.index)
+            out[c] = v.astype(object).where(v.notna(), "").astype(str).str.strip()
+    out["priority"] = out["priority"].str.upper().where(out["priority"] != "", "P3")
+    out["status"] = out["status"].where(out["status"] != "", "À faire")
+
+    # Same closing rule as the editor: "Fait" is closed (today if no date), anything else is open
+    is_done = out["status"] == "Fait"
+    out["closed_at"] = out["closed_at"].where(out["closed_at"].notna(), date.today()).where(is_done, None)
+    return out
+
+
+def _import_violations(df: pd.DataFrame, raw: pd.DataFrame, mapping: Dict[Any, str]) -> pd.DataFrame:
+    v = validate_actions_df(df, require_text=True)
+    extra = []
+    # A date that is present but unreadable is reported as such, not as missing
+    for src, field in mapping.items():
+        if field == "due_date":
+            bad = df["due_date"].isna() & (raw[src].astype(str).str.strip() != "") & raw[src].notna()
+            if bad.any():
+                extra.append(pd.DataFrame({"row": df.index[bad.to_numpy()], "field": "due_date", "message": "Échéance illisible."}))
+                v = v[~(v["field"].eq("due_date") & v["row"].isin(df.index[bad.to_numpy()]))]
+    for field, list_name in (("status", "statuses"), ("priority", "priorities")):
+        allowed = get_list(list_name)
+        bad = ~df[field].isin(allowed)
+        if bad.any():
+            extra.append(pd.DataFrame({
+                "row": df.index[bad.to_numpy()], "field": field,
+                "message": f"Valeur inconnue (attendu : {', '.join(allowed)}).",
+            }))
+    return pd.concat([v] + extra, ignore_index=True) if extra else v
+
+
+@dataclass
+class ImportReport:
+    rows: int                   # data rows read
+    valid: int
+    inserted: int               # 0 on a dry run
+    errors: pd.DataFrame        # source_row (line in the file), field, message
+    unmapped_columns: List[str]
+    action_ids: List[str]       # IDs given to the inserted rows
+    preview: pd.DataFrame       # first valid rows as they will be stored
+
+
+def iter_import_chunks(source: Any, fmt: Optional[str] = None, chunk_size: int = IMPORT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Raw chunks of a CSV/XLSX file (path or file object), with `source_row` = line number in the file.
+    """
+    if fmt is None:
+        fmt = str(getattr(source, "name", source)).rsplit(".", 1)[-1].lower()
+    if fmt not in ("csv", "xlsx"):
+        raise ValueError(f"Format d’import non supporté : {fmt} (csv ou xlsx)")
+    reader = _iter_csv if fmt == "csv" else _iter_xlsx
+
+    line = 2  # line 1 = header
+    for chunk in reader(source, chunk_size):
+        chunk.index = pd.RangeIndex(line, line + len(chunk), name="source_row")
+        line += len(chunk)
+        yield chunk
+
+
+@_timed
+def import_actions(
+    source: Any,
+    fmt: Optional[str] = None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    dry_run: bool = False,
+    preview_rows: int = 20,
+) -> ImportReport:
+    """
+    Imports the valid rows of a CSV/XLSX file; invalid rows are skipped and reported.
+    `dry_run` validates only (preview before committing).
+    """
+    rows = inserted = valid = 0
+    errors: List[pd.DataFrame] = []
+    ids: List[str] = []
+    previews: List[pd.DataFrame] = []
+    unmapped: List[str] = []
+    mapping: Optional[Dict[Any, str]] = None
+
+    chunks = iter_import_chunks(source, fmt, chunk_size)
+    while True:
+        try:
+            raw = next(chunks, None)
+        except UnicodeDecodeError:
+            # Nothing was imported yet: the encoding is checked before the first chunk
+            errors.append(pd.DataFrame([{
+                "source_row": None, "field": "fichier",
+                "message": "Encodage illisible (attendu : UTF-8 ou Windows-1252).",
+            }]))
+            break
+        if raw is None:
+            break
+        if mapping is None:
+            mapping = map_import_columns(list(raw.columns))
+            unmapped = [str(c) for c in raw.columns if c not in mapping]
+        rows += len(raw)
+        df = _prepare_import_chunk(raw, mapping)
+        bad = _import_violations(df, raw, mapping)
+        if not bad.empty:
+            errors.append(bad.rename(columns={"row": "source_row"}))
+        ok = df[~df.index.isin(bad["row"])]
+        valid += len(ok)
+        if sum(len(p) for p in previews) < preview_rows:
+            previews.append(ok.head(preview_rows))
+        if dry_run or ok.empty:
+            continue
+
+        records = ok.astype(object).where(ok.notna(), None).to_dict("records")
+        with _write_session() as s:
+            pks = _allocate_ids(s, len(records))
+            new_ids = [_format_action_id(pk) for pk in pks]
+            version = _next_version(s)
+            for r, pk, action_id in zip(records, pks, new_ids):
+                r["id"], r["action_id"], r["row_version"] = pk, action_id, version
+            s.execute(insert(Action), records)
+            _log_events(s, _initial_events(ok.assign(id=pks), int(time.time())))
+            _index_signatures(s, pks, [r.get("problem") for r in records], replace=False)
+            s.commit()
+        ids.extend(new_ids)
+        inserted += len(records)
+
+    if inserted:
+        _data_changed()
+
+    preview = pd.concat(previews).head(preview_rows) if previews else pd.DataFrame(columns=IMPORT_COLUMNS)
+    return ImportReport(
+        rows=rows,
+        valid=valid,
+        inserted=inserted,
+        errors=pd.concat(errors, ignore_index=True) if errors else pd.DataFrame(columns=["source_row", "field", "message"]),
+        unmapped_columns=unmapped,
+        action_ids=ids,
+        preview=preview,
+    )
+
+
+# -------------------- ARCHIVE --------------------
+# Closed actions leave the hot table after ARCHIVE_AFTER_DAYS: the board, KPIs and exports
+# only scan the open backlog. History (filters["history"]) reads both tables.
+ARCHIVE_AFTER_DAYS = int(os.environ.get("QR1_ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_BATCH_SIZE = 2000
+
+
+def _archivable(cutoff: date):
+    # "Annulé" has no closed_at: its creation date counts instead
+    closed_on = func.coalesce(Action.closed_at, func.date(Action.created_at))
+    return and_(Action.status.in_(CLOSED_STATUSES), closed_on < cutoff)
+
+
+def _move_events(kind: str, src, where):
+    # Archive moves keep the status: the event only marks when the row changed table
+    return insert(ActionEvent).from_select(EVENT_COLUMNS, select(
+        src.c.id, literal(int(time.time())), literal(kind), src.c.status, src.c.dept_owner,
+        case((src.c.status == "Bloqué", src.c.blockage), else_=""),
+    ).where(where))
+
+
+@_timed
+def archive_actions(older_than_days: Optional[int] = None, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Moves actions closed more than `older_than_days` ago (default ARCHIVE_AFTER_DAYS) to
+    actions_archive, `batch_size` rows per write transaction. Returns the number moved.
+    """
+    days = ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff = date.today() - timedelta(days=days)
+    hot, arch = Action.__table__, ActionArchive.__table__
+    cols = [c.name for c in hot.columns if c.name != "row_version"]
+
+    moved = 0
+    while True:
+        with _write_session() as s:
+            # Same batch for both statements: nobody else writes during the transaction
+            batch = select(hot.c.id).where(_archivable(cutoff)).order_by(hot.c.id).limit(batch_size)
+            s.execute(_move_events("archived", hot, hot.c.id.in_(batch)))
+            s.execute(insert(arch).from_select(
+                cols + ["archived_at", "row_version"],
+                select(
+                    *[hot.c[c] for c in cols],
+                    bindparam("now", datetime.utcnow(), type_=DateTime),
+                    bindparam("version", _next_version(s), type_=Integer),
+                ).where(hot.c.id.in_(batch)),
+            ))
+            sig = ActionSignature.__table__
+            s.execute(delete(sig).where(sig.c.action_pk.in_(batch)))
+            n = s.execute(delete(hot).where(hot.c.id.in_(batch))).rowcount
+            s.commit()
+        moved += n
+        if n < batch_size:
+            break
+
+    if moved:
+        _data_changed()
+    return moved
+
+
+@_timed
+def restore_actions(action_ids: List[str]) -> List[str]:
+    """
+    Moves archived actions back to the hot table (same id and action_id), returns those found.
+    A restored action that stays closed goes back at the next archive run.
+    """
+    hot, arch = Action.__table__, ActionArchive.__table__
+    cols = [c.name for c in hot.columns if c.name != "row_version"]
+    restored: List[str] = []
+    with _write_session() as s:
+        version = bindparam("version", _next_version(s), type_=Integer)
+        for i in range(0, len(action_ids), _IN_CHUNK):
+            chunk = arch.c.action_id.in_(action_ids[i:i + _IN_CHUNK])
+            found = s.execute(select(arch.c.action_id).where(chunk)).scalars().all()
+            if not found:
+                continue
+            s.execute(insert(hot).from_select(
+                cols + ["row_version"], select(*[arch.c[c] for c in cols], version).where(chunk)
+            ))
+            s.execute(_move_events("restored", arch, chunk))
+            back = s.execute(select(arch.c.id, arch.c.problem).where(chunk)).all()
+            _index_signatures(s, [r[0] for r in back], [r[1] for r in back])
+            s.execute(delete(arch).where(chunk))
+            restored.extend(found)
+        s.commit()
+
+    if restored:
+        _data_changed()
+    return restored
+
+
+@_timed
+@_cached
+def archive_stats(older_than_days: Optional[int] = None) -> Dict[str, int]:
+    """
+    Row counts: hot table, archive, and hot rows an archive run would move now.
+    """
+    days = ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff = date.today() - timedelta(days=days)
+    with SessionLocal() as s:
+        hot = s.execute(select(func.count(Action.id))).scalar_one()
+        due = s.execute(select(func.count(Action.id)).where(_archivable(cutoff))).scalar_one()
+        archived = s.execute(select(func.count(ActionArchive.id))).scalar_one()
+    return {"hot": int(hot), "archived": int(archived), "archivable": int(due)}
@@ -1,9 +1,39 @@
 import streamlit as st
-import pandas as pd
 
-from db import list_actions, update_actions_from_df, get_list
+from db import (
+    init_db, list_actions_page, update_actions_from_df, validate_actions_df, violation_grid,
+    get_action_details, get_list, page_timer, timed_section
+)
+
+
+perf = page_timer("Actions")
+init_db()
+
+DETAIL_LABELS = {
+    "problem": "Problème",
+    "containment": "Containment",
+    "root_cause": "Cause racine",
+    "countermeasure": "Action / Contre-mesure",
+    "next_step": "Prochaine étape",
+}
 
 
+def detail_panel(action_ids):
+    # Textes complets chargés à la demande (la liste n'en porte pas)
+    st.divider()
+    st.subheader("🔎 Détail d’une action")
+    picked = st.selectbox("Action", action_ids, index=None, placeholder="Choisir une action de la page…")
+    if picked is None:
+        return
+    details = get_action_details([picked])
+    if details.empty:
+        st.warning("Action introuvable.")
+        return
+    row = details.iloc[0]
+    for field, label in DETAIL_LABELS.items():
+        st.markdown(f"**{label}**")
+        st.text(row[field] or "–")
+
 st.title("Actions – Liste & mise à jour")
 st.caption("Filtrer, rechercher, et mettre à jour rapidement : statut, échéance, prochaine étape, blocage.")
 
@@ -22,38 +52,77 @@ with f3:
 with f4:
     prio = st.selectbox("Priorité", priorities, index=0)
 with f5:
-    search = st.text_input("Recherche (problème / action)", value="")
+    search = st.text_input("Recherche (problème, action, cause, containment, prochaine étape)", value="")
 
-only_open = st.checkbox("Seulement ouvertes (≠ Fait/Annulé)", value=False)
+o1, o2 = st.columns(2)
+with o1:
+    only_open = st.checkbox("Seulement ouvertes (≠ Fait/Annulé)", value=False)
+with o2:
+    history = st.checkbox("Inclure l’historique (actions archivées)", value=False)
 
-df = list_actions({
+# On montre une table éditable limitée aux champs de pilotage
+edit_cols = [
+    "action_id", "dept_owner", "owner_name", "support_needed",
+    "priority", "due_date", "status", "blockage", "next_step",
+    "proof_link", "standard_updated", "quality_validation_required"
+]
+
+filters = {
     "dept_owner": dept,
     "type": typ,
     "status": status,
     "priority": prio,
     "search": search,
-    "only_open": only_open
-})
+    "only_open": only_open,
+    "history": history
+}
 
-if df.empty:
+# Pagination par curseur : une fenêtre de PAGE_SIZE lignes à la fois
+PAGE_SIZE = 200
+filter_key = tuple(filters.values())
+if st.session_state.get("actions_filter_key") != filter_key:
+    st.session_state["actions_filter_key"] = filter_key
+    st.session_state["actions_cursors"] = [None]
+cursors = st.session_state["actions_cursors"]
+
+with timed_section("Actions · chargement page"):
+    page = list_actions_page(filters, columns=edit_cols, page_size=PAGE_SIZE, cursor=cursors[-1])
+
+if page.total == 0:
     st.warning("Aucune action.")
+    perf.done()
     st.stop()
 
 st.divider()
 
 st.subheader("Tableau (édition rapide)")
 
-# On montre une table éditable limitée aux champs de pilotage
-edit_cols = [
-    "action_id", "dept_owner", "owner_name", "support_needed",
-    "priority", "due_date", "status", "blockage", "next_step",
-    "proof_link", "standard_updated", "quality_validation_required"
-]
-view = df[edit_cols].copy()
+first_row = (len(cursors) - 1) * PAGE_SIZE
+p1, p2, p3 = st.columns([1, 1, 4])
+with p1:
+    if st.button("◀ Précédent", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+with p2:
+    if st.button("Suivant ▶", disabled=page.next_cursor is None):
+        cursors.append(page.next_cursor)
+        st.rerun()
+with p3:
+    st.caption(f"Lignes {first_row + 1}–{first_row + len(page.df)} sur {page.total}")
+
+view = page.df[edit_cols].copy()
+
+if history:
+    # Historique en lecture seule : une action archivée se restaure depuis Diagnostics
+    st.dataframe(view, use_container_width=True, height=520, hide_index=True)
+    detail_panel(view["action_id"].tolist())
+    perf.done()
+    st.stop()
 
 # Rendre action_id non editable
 edited = st.data_editor(
     view,
+    key=f"actions_editor_{len(cursors)}",
     use_container_width=True,
     height=520,
     disabled=["action_id"],
@@ -65,17 +134,39 @@ edited = st.data_editor(
 
 colA, colB = st.columns([1,3])
 with colA:
-    if st.button("💾 Enregistrer les modifications"):
-        # On enregistre seulement les lignes qui ont changé
-        # (simple : on compare dataframe)
-        diff_mask = (edited != view).any(axis=1)
-        changes = edited.loc[diff_mask].copy()
-        if changes.empty:
-            st.info("Aucune modification détectée.")
-        else:
-            update_actions_from_df(changes)
-            st.success(f"Modifications enregistrées : {len(changes)} ligne(s).")
-            st.rerun()
+    save = st.button("💾 Enregistrer les modifications")
 
 with colB:
     st.info("Règle Lean : si Statut = Bloqué → renseigne Blocage + Prochaine étape. Si Statut = Fait → ajoute une preuve (lien).")
+
+if save:
+    # On enregistre seulement les lignes qui ont changé (sur la page affichée)
+    diff_mask = ~((edited == view) | (edited.isna() & view.isna())).all(axis=1)
+    changes = edited.loc[diff_mask].copy()
+    violations = validate_actions_df(changes)
+    if changes.empty:
+        st.info("Aucune modification détectée.")
+    elif not violations.empty:
+        # Rien n'est enregistré tant qu'une ligne modifiée enfreint une règle
+        bad = changes.loc[violations["row"].unique()]
+        st.error(f"Enregistrement refusé : {len(bad)} ligne(s) ne respectent pas les règles Lean.")
+        grid = violation_grid(bad, violations)
+        st.dataframe(
+            bad.style.apply(lambda _: grid.map(lambda msg: "background-color: #ffd6d6" if msg else ""), axis=None),
+            use_container_width=True
+        )
+        table = violations.assign(action_id=changes.loc[violations["row"], "action_id"].to_numpy())
+        st.dataframe(table[["action_id", "field", "message"]], use_container_width=True, hide_index=True)
+    else:
+        with timed_section("Actions · enregistrement"):
+            report = update_actions_from_df(changes)
+        counts = report["result"].value_counts()
+        st.success(f"Modifications enregistrées : {int(counts.get('updated', 0))} ligne(s).")
+        if counts.get("missing", 0):
+            st.warning(f"Actions introuvables : {', '.join(report.loc[report['result'] == 'missing', 'action_id'])}")
+        else:
+            st.rerun()
+
+detail_panel(view["action_id"].tolist())
+
+perf.done()
@@ -2,11 +2,14 @@ import streamlit as st
 from datetime import date
 
 from db import (
-    next_action_id, create_action, validate_action_fields,
-    get_list
+    init_db, create_action, validate_action_fields, similar_actions,
+    get_list, page_timer, timed_section
 )
 
 
+perf = page_timer("Nouvelle action")
+init_db()
+
 st.title("Nouvelle action – Capture d’un irritant / problème")
 st.caption("Objectif : 30 secondes pour créer une action actionnable (responsable + échéance + priorité).")
 
@@ -18,6 +21,22 @@ priorities = get_list("priorities")
 blockages = [""] + get_list("blockages")
 kinds = [""] + get_list("action_kinds")
 
+# Après une création : vider le champ Problème avant de le dessiner, puis confirmer
+created = st.session_state.pop("new_action_created", None)
+if created:
+    st.session_state["new_problem"] = ""
+    st.success(f"Action créée : {created}")
+    st.info("Va sur Dashboard QR1 pour la voir dans les priorités / blocages.")
+
+# Hors formulaire : les actions ouvertes similaires s’affichent dès que le problème est saisi
+problem = st.text_area("Problème (factuel) *", key="new_problem", height=90, placeholder="Ex: Rayure sur pièce lors du montage à l’étape X")
+if problem.strip():
+    with timed_section("Nouvelle action · doublons"):
+        similar = similar_actions(problem)
+    if not similar.empty:
+        st.warning("⚠️ Actions ouvertes similaires – vérifier avant de créer un doublon :")
+        st.dataframe(similar, use_container_width=True, hide_index=True)
+
 with st.form("new_action", clear_on_submit=True):
     c1, c2, c3 = st.columns(3)
     with c1:
@@ -47,7 +66,6 @@ with st.form("new_action", clear_on_submit=True):
         proof_link = st.text_input("Preuve (lien) (optionnel, utile à la clôture)", value="")
         blockage = st.selectbox("Blocage (si Bloqué)", blockages, index=0)
 
-    problem = st.text_area("Problème (factuel) *", value="", height=90, placeholder="Ex: Rayure sur pièce lors du montage à l’étape X")
     containment = st.text_area("Containment immédiat (optionnel)", value="", height=70, placeholder="Ex: Trier 100% temporairement, isoler lot…")
     countermeasure = st.text_area("Action / Contre-mesure *", value="", height=90, placeholder="Ex: Ajouter protection mousse + standard manipulation")
     next_step = st.text_area("Prochaine étape (obligatoire si En cours/Bloqué)", value="", height=70)
@@ -76,7 +94,6 @@ with st.form("new_action", clear_on_submit=True):
             st.stop()
 
         payload = {
-            "action_id": next_action_id(),
             "created_by": created_by.strip(),
             "zone": zone.strip(),
             "line": line.strip(),
@@ -101,6 +118,7 @@ with st.form("new_action", clear_on_submit=True):
             "quality_validation_required": bool(quality_validation_required),
         }
 
-        create_action(payload)
-        st.success(f"Action créée : {payload['action_id']}")
-        st.info("Va sur Dashboard QR1 pour la voir dans les priorités / blocages.")
+        st.session_state["new_action_created"] = create_action(payload)
+        st.rerun()
+
+perf.done()
@@ -0,0 +1,91 @@
+import streamlit as st
+
+from db import (
+    init_db, perf_summary, slowest_queries, perf_events, clear_perf,
+    cache_stats, schema_version, PERF_BUFFER_SIZE, PERF_LOG_PATH, page_timer,
+    archive_stats, archive_actions, restore_actions, ARCHIVE_AFTER_DAYS,
+    duplicate_clusters
+)
+
+
+perf = page_timer("Diagnostics")
+init_db()
+
+st.title("Diagnostics – Performance")
+st.caption("Où passe le temps : SQLite, fonctions db.py, rendu des pages (mesures de ce processus).")
+
+events = perf_events()
+c1, c2, c3 = st.columns(3)
+c1.metric("Mesures en mémoire", f"{len(events)} / {PERF_BUFFER_SIZE}")
+stats = cache_stats()
+hits, misses = stats["hits"], stats["misses"]
+c2.metric("Cache requêtes (hit rate)", f"{hits / (hits + misses):.0%}" if hits + misses else "–")
+c3.metric("Version schéma", schema_version())
+
+if PERF_LOG_PATH:
+    st.caption(f"Journal JSON lines : {PERF_LOG_PATH}")
+
+st.divider()
+
+st.subheader("⏱️ Rendu des pages (p95)")
+st.dataframe(perf_summary("page"), use_container_width=True)
+
+st.subheader("🧩 Sections de page")
+st.dataframe(perf_summary("section"), use_container_width=True)
+
+st.divider()
+
+st.subheader("⚙️ Fonctions db.py (p95)")
+st.dataframe(perf_summary("function"), use_container_width=True)
+
+st.subheader("🐢 Requêtes SQL les plus lentes")
+st.dataframe(slowest_queries(20), use_container_width=True, height=320)
+
+st.subheader("🔁 Requêtes SQL par empreinte")
+st.dataframe(perf_summary("query"), use_container_width=True, height=320)
+
+st.divider()
+
+st.subheader("🗄️ Archives (actions clôturées)")
+days = st.number_input("Archiver les actions clôturées depuis plus de (jours)", min_value=7, value=ARCHIVE_AFTER_DAYS)
+arch = archive_stats(int(days))
+a1, a2, a3 = st.columns(3)
+a1.metric("Table active", arch["hot"])
+a2.metric("Archivées", arch["archived"])
+a3.metric("À archiver", arch["archivable"])
+if st.button(f"📦 Archiver {arch['archivable']} action(s)", disabled=arch["archivable"] == 0):
+    st.session_state["archive_msg"] = f"{archive_actions(int(days))} action(s) archivée(s)."
+    st.rerun()
+to_restore = st.text_input("Restaurer (action_id séparés par des virgules)", value="")
+if st.button("↩️ Restaurer") and to_restore.strip():
+    restored = restore_actions([a.strip() for a in to_restore.split(",") if a.strip()])
+    st.session_state["archive_msg"] = (
+        f"Restaurée(s) : {', '.join(restored)}" if restored else "Aucune action archivée trouvée."
+    )
+    st.rerun()
+if "archive_msg" in st.session_state:
+    st.success(st.session_state.pop("archive_msg"))
+
+st.divider()
+
+st.subheader("🧬 Doublons probables (actions ouvertes)")
+st.caption("Problèmes quasi identiques (similarité des trigrammes de caractères), regroupés par cluster.")
+min_score = st.slider("Similarité minimale", min_value=0.3, max_value=1.0, value=0.6, step=0.05)
+if st.button("🔍 Chercher les doublons"):
+    clusters = duplicate_clusters(min_score=float(min_score))
+    if clusters.empty:
+        st.success("Aucun doublon probable.")
+    else:
+        st.write(f"{clusters['cluster'].nunique()} groupe(s), {len(clusters)} action(s).")
+        st.dataframe(clusters, use_container_width=True, hide_index=True)
+
+st.divider()
+
+with st.expander("Cache"):
+    st.json(stats)
+
+if st.button("🗑️ Vider les mesures"):
+    clear_perf()
+    st.rerun()
+
+perf.done()
@@ -0,0 +1,62 @@
+import hashlib
+import io
+
+import streamlit as st
+
+from db import init_db, import_actions, page_timer, timed_section
+
+
+perf = page_timer("Import")
+init_db()
+
+st.title("Import – Reprise d’un ancien tableau d’actions")
+st.caption("CSV (; ou ,) ou Excel. Les colonnes sont reconnues par leur nom (Problème, Responsable, Échéance, Statut…).")
+
+uploaded = st.file_uploader("Fichier à importer", type=["csv", "xlsx"])
+if uploaded is None:
+    st.info("Règles Lean vérifiées avant import : responsable, département, échéance, "
+            "prochaine étape (En cours / Bloqué), blocage (Bloqué), preuve (Fait), problème et action.")
+    perf.done()
+    st.stop()
+
+content = uploaded.getvalue()
+fmt = uploaded.name.rsplit(".", 1)[-1].lower()
+digest = hashlib.sha1(content).hexdigest()
+
+# Contrôle à blanc (une fois par fichier)
+if st.session_state.get("import_digest") != digest:
+    with timed_section("Import · contrôle"):
+        st.session_state["import_check"] = import_actions(io.BytesIO(content), fmt=fmt, dry_run=True)
+    st.session_state["import_digest"] = digest
+check = st.session_state["import_check"]
+
+c1, c2, c3 = st.columns(3)
+c1.metric("Lignes lues", check.rows)
+c2.metric("Valides", check.valid)
+c3.metric("En erreur", check.rows - check.valid)
+
+if check.unmapped_columns:
+    st.caption(f"Colonnes ignorées : {', '.join(check.unmapped_columns)}")
+
+if not check.errors.empty:
+    st.subheader("❌ Erreurs (ligne du fichier)")
+    st.dataframe(check.errors, use_container_width=True, height=260)
+
+st.subheader("👀 Aperçu des lignes valides")
+st.dataframe(check.preview, use_container_width=True, height=260)
+
+st.divider()
+
+if check.valid == 0:
+    st.warning("Aucune ligne valide à importer.")
+elif st.session_state.get("import_done") == digest:
+    st.info("Ce fichier a déjà été importé.")
+elif st.button(f"📥 Importer {check.valid} action(s) valide(s)"):
+    with timed_section("Import · écriture"):
+        report = import_actions(io.BytesIO(content), fmt=fmt)
+    st.session_state["import_done"] = digest
+    st.success(f"{report.inserted} action(s) importée(s) : {report.action_ids[0]} → {report.action_ids[-1]}.")
+    if report.rows != report.valid:
+        st.info(f"{report.rows - report.valid} ligne(s) ignorée(s) (voir les erreurs ci-dessus).")
+
+perf.done()
@@ -0,0 +1,57 @@
+import streamlit as st
+
+from analytics import cumulative_flow, weekly_throughput, lead_cycle_times, blocked_pareto, refresh_daily_flow
+from db import init_db, get_list, page_timer, timed_section
+
+
+perf = page_timer("Analyse")
+init_db()
+with timed_section("Analyse · jours à matérialiser"):
+    refresh_daily_flow()  # matérialise les journées terminées depuis la dernière visite
+
+st.title("Analyse du flux – CFD, délais, blocages")
+st.caption("Historique des changements de statut : où le travail s’accumule, combien de temps il met, ce qui le bloque.")
+
+PERIODS = {"90 jours": 90, "1 an": 365, "2 ans": 730}
+
+fc1, fc2 = st.columns(2)
+with fc1:
+    period = st.selectbox("Période", list(PERIODS), index=2)
+with fc2:
+    dept = st.selectbox("Département", ["Tous"] + get_list("departments"), index=0)
+days = PERIODS[period]
+
+# Diagramme de flux cumulé
+st.subheader("📈 Diagramme de flux cumulé")
+with timed_section("Analyse · CFD"):
+    cfd = cumulative_flow(days, dept)
+if cfd.empty:
+    st.info("Aucun historique pour l’instant.")
+    perf.done()
+    st.stop()
+st.area_chart(cfd)
+
+st.subheader("✅ Débit (actions passées à Fait par semaine)")
+st.bar_chart(weekly_throughput(days, dept), x="week", y="closed")
+
+st.divider()
+
+# Délais (lead time / cycle time)
+st.subheader("⏳ Délais par département (jours)")
+st.caption("Lead time : création → Fait. Cycle time : premier passage En cours → Fait. Percentiles 50 / 85 / 95.")
+with timed_section("Analyse · délais"):
+    st.dataframe(lead_cycle_times(), use_container_width=True)
+
+st.divider()
+
+# Pareto du temps bloqué
+st.subheader("🚧 Pareto du temps bloqué (jours, par motif)")
+with timed_section("Analyse · blocages"):
+    pareto = blocked_pareto(days, dept)
+if pareto.empty:
+    st.info("Aucun blocage sur la période.")
+else:
+    st.bar_chart(pareto, x="blockage", y="days")
+    st.dataframe(pareto, use_container_width=True)
+
+perf.done()
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path):
+    """
+    A fresh file-backed (WAL) database for the test, the app's own settings.
+    """
+    db.use_database(f"sqlite:///{tmp_path / 'qr1_test.db'}")
+    db.init_db()
+    yield db
+    db.engine.dispose()
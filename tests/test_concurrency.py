@@ -0,0 +1,99 @@
+import threading
+from datetime import date
+
+import pandas as pd
+import pytest
+
+WRITERS = 8
+PER_WRITER = 25
+
+
+def test_concurrent_writers(database):
+    db = database
+    created = []
+    errors = []
+    lock = threading.Lock()
+    start = threading.Barrier(WRITERS)
+
+    def writer(k):
+        mine = []
+        start.wait()
+        try:
+            for i in range(PER_WRITER):
+                mine.append(db.create_action({
+                    "problem": f"stress {k}-{i}", "countermeasure": "stress", "owner_name": f"Resp {k}",
+                    "dept_owner": "ASSY", "due_date": date.today(),
+                }))
+                if i % 5 == 4:
+                    report = db.update_actions_from_df(pd.DataFrame({"action_id": mine[-5:], "priority": "P1"}))
+                    assert (report["result"] == "updated").all()
+        except Exception as exc:
+            with lock:
+                errors.append(exc)
+        with lock:
+            created.extend(mine)
+
+    threads = [threading.Thread(target=writer, args=(k,)) for k in range(WRITERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not [e for e in errors if "database is locked" in str(e)]
+    assert not errors
+    assert len(created) == WRITERS * PER_WRITER
+    assert len(set(created)) == len(created)
+
+    stored = db.list_actions({}, columns=["action_id", "priority"])
+    assert sorted(stored["action_id"]) == sorted(created)
+    assert (stored["priority"] == "P1").all()
+
+
+def test_write_queue_accepts_what_create_action_accepts(database):
+    db = database
+    # No due date, no countermeasure: the direct insert takes it, so must the queue
+    partial = {"problem": "queue parity", "owner_name": "Resp", "dept_owner": "ASSY"}
+    unknown = dict(partial, not_a_column="x")
+
+    direct = db.create_action(partial)
+    with pytest.raises(Exception) as direct_error:
+        db.create_action(unknown)
+
+    writer = db.enable_write_queue()
+    try:
+        futures = [writer.submit_create(p) for p in (partial, unknown, partial)]
+        queued_error = type(futures[1].exception(timeout=10))
+        queued = [futures[0].result(timeout=10), futures[2].result(timeout=10)]
+    finally:
+        db.disable_write_queue()
+
+    assert queued_error is direct_error.type
+    assert len({direct, *queued}) == 3
+    assert db.count_actions({}) == 3
+
+
+def test_stopped_write_queue_falls_back_to_direct_writes(database):
+    db = database
+    writer = db.enable_write_queue()
+    writer.close()  # as if the writer thread had died
+    try:
+        action_id = db.create_action({"problem": "fallback", "owner_name": "Resp", "dept_owner": "ASSY"})
+    finally:
+        db.disable_write_queue()
+    assert db.count_actions({}) == 1
+    assert writer.requests == 0
+    assert action_id
+
+
+def test_stalled_write_queue_times_out(database, monkeypatch):
+    db = database
+    release = threading.Event()
+    monkeypatch.setattr(db, "WRITE_QUEUE_TIMEOUT_S", 0.2)
+    monkeypatch.setattr(db.WriteQueue, "_write", lambda self, batch: release.wait(10))
+    db.enable_write_queue()
+    try:
+        with pytest.raises(TimeoutError):
+            db.create_action({"problem": "stalled", "owner_name": "Resp", "dept_owner": "ASSY"})
+    finally:
+        release.set()
+        db.disable_write_queue()
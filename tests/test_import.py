@@ -0,0 +1,18 @@
+import io
+from datetime import date
+
+
+def test_import_mixed_date_formats(database):
+    db = database
+    rows = ["Problème;Action;Responsable;Département;Échéance;Statut;Priorité"]
+    for due in ("15/03/2025", "2025-04-01", "01/04/2025", "2025-04-02 10:30", "5/3/2025"):
+        rows.append(f"Fuite huile;Changer le joint;Resp;ASSY;{due};À faire;P2")
+    content = ("\n".join(rows) + "\n").encode("utf-8")
+
+    report = db.import_actions(io.BytesIO(content), fmt="csv", dry_run=True)
+
+    assert report.errors.empty, report.errors.to_dict("records")
+    assert report.valid == 5
+    assert report.preview["due_date"].tolist() == [
+        date(2025, 3, 15), date(2025, 4, 1), date(2025, 4, 1), date(2025, 4, 2), date(2025, 3, 5),
+    ]
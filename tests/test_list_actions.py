@@ -0,0 +1,20 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+
+@pytest.mark.parametrize("categorical", [False, True])
+def test_empty_result_keeps_dtypes(database, categorical):
+    db = database
+    db.create_action({
+        "problem": "Fuite huile", "countermeasure": "Joint", "owner_name": "Resp",
+        "dept_owner": "ASSY", "due_date": date.today(), "m6": "Machine",
+    })
+
+    full = db.list_actions({}, categorical=categorical)
+    empty = db.list_actions({"dept_owner": "Aucun"}, categorical=categorical)
+
+    assert empty.empty
+    assert empty.dtypes.equals(full.dtypes)
+    assert pd.concat([empty, full]).dtypes.equals(full.dtypes)
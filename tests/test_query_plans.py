@@ -0,0 +1,44 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+import bench
+
+# Each hot read must be served by its index from the migration 1 pack (see _m001_query_indexes)
+CASES = {
+    "ix_actions_board": lambda db: db.list_actions({}),
+    "ix_actions_open_board": lambda db: db.list_actions({"only_open": True}),
+    "ix_actions_status": lambda db: db.kpis(),
+    "ix_actions_open_type": lambda db: db.type_pareto(),
+}
+
+
+@pytest.fixture
+def populated(database):
+    bench.load_synthetic(3000)
+    with database.engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    return database
+
+
+def _plans(db, call):
+    statements = []
+
+    def grab(conn, clauseelement, multiparams, params, execution_options):
+        if isinstance(clauseelement, Select):
+            statements.append(clauseelement)
+
+    db.clear_cache()
+    event.listen(db.engine, "before_execute", grab)
+    try:
+        call(db)
+    finally:
+        event.remove(db.engine, "before_execute", grab)
+    assert statements
+    return [line for stmt in statements for line in db.explain_query_plan(stmt)]
+
+
+@pytest.mark.parametrize("index", list(CASES))
+def test_read_uses_index(populated, index):
+    plan = _plans(populated, CASES[index])
+    assert any(index in line for line in plan), plan
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+import time
+
+from sqlalchemy import event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_db_defers_pandas():
+    script = "import sys, db; print('pandas' in sys.modules, 'numpy' in sys.modules)"
+    proc = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert proc.stdout.split() == ["False", "False"]
+
+
+def test_init_db_again_is_a_noop(database):
+    db = database
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        t0 = time.perf_counter()
+        db.init_db()
+        elapsed = time.perf_counter() - t0
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+
+    assert statements == []
+    assert elapsed < 0.01
+
+
+def test_dashboard_first_render(database):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "pages", "1_Dashboard_QR1.py"), default_timeout=120).run()
+    assert not at.exception
@@ -0,0 +1,26 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, update
+
+
+def test_update_keeps_null_text(database):
+    db = database
+    action_id = db.create_action({
+        "problem": "Fuite huile", "countermeasure": "Joint", "owner_name": "Resp",
+        "dept_owner": "ASSY", "due_date": date.today(),
+    })
+    with db._write_session() as s:
+        s.execute(update(db.Action).where(db.Action.action_id == action_id).values(support_needed=None, next_step=None))
+        s.commit()
+
+    # The editor hands back NULL text as NaN/None
+    report = db.update_actions_from_df(pd.DataFrame({
+        "action_id": [action_id], "support_needed": [np.nan], "next_step": [None], "priority": ["P1"],
+    }))
+
+    assert report["changed"].tolist() == ["priority"]
+    with db.SessionLocal() as s:
+        row = s.execute(select(db.Action.support_needed, db.Action.next_step).where(db.Action.action_id == action_id)).one()
+    assert tuple(row) == (None, None)